@@ -40,6 +40,8 @@ VIDEO_SET_CURSOR_ATTR = 6
 VIDEO_SET_BORDER_ATTR = 7
 # put character glyph
 VIDEO_PUT_GLYPH = 8
+# put run of halfwidth character glyphs
+VIDEO_PUT_TEXT = 9
 # clear rows
 VIDEO_CLEAR_ROWS = 10
 # scroll
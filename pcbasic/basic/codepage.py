@@ -226,7 +226,14 @@ class NewlineWrapper(StreamWrapperBase):
 
     def read(self, n=-1):
         """Read n bytes from stream with codepage conversion."""
-        return self._stream.read(n).replace(b'\r\n', b'\r').replace(b'\n', b'\r')
+        s = self._stream.read(n)
+        # don't split a CR LF pair between reads, also if preceded by more CRs
+        while s[-1:] == b'\r':
+            c = self._stream.read(1)
+            if not c:
+                break
+            s += c
+        return s.replace(b'\r\n', b'\r').replace(b'\n', b'\r')
 
 
 ########################################
@@ -8,6 +8,7 @@ This file is released under the GNU GPL version 3 or later.
 
 import io
 import os
+import re
 import struct
 import logging
 from contextlib import contextmanager
@@ -25,6 +26,15 @@ def nullstream():
 TYPE_TO_MAGIC = {b'B': b'\xFF', b'P': b'\xFE', b'M': b'\xFD'}
 MAGIC_TO_TYPE = {b'\xFF': b'B', b'\xFE': b'P', b'\xFD': b'M'}
 
+# nonprinting characters including tabs are not counted for WIDTH
+NONPRINTING = bytes(bytearray(range(32)))
+
+# run of characters without control codes
+PRINTABLE_RUN = re.compile(b'[^\\x00-\\x1f]+')
+
+def _printing_width(s):
+    """Number of characters that advance the column."""
+    return len(s.translate(None, NONPRINTING))
 
 
 ############################################################################
@@ -309,35 +319,22 @@ class TextFileBase(RawFile):
         """Write the string s to the file, taking care of width settings."""
         assert isinstance(s, bytes)
         # only break lines at the start of a new string. width 255 means unlimited width
-        s_width = 0
-        newline = False
-        # find width of first line in s
-        for c in iterchar(s):
-            if c in (b'\r', b'\n'):
-                newline = True
-                break
-            if c >= b' ':
-                # nonprinting characters including tabs are not counted for WIDTH
-                s_width += 1
+        # and only if the first line in s is also its last
         if (
                 can_break and self.width != 255 and self.col != 1 and
-                self.col-1 + s_width > self.width and not newline
+                b'\r' not in s and b'\n' not in s and
+                self.col-1 + _printing_width(s) > self.width
             ):
             self.write_line()
             self.col = 1
-        for c in iterchar(s):
-            # don't replace CR or LF with CRLF when writing to files
-            if c == b'\r':
-                self._fhandle.write(c)
-                self.col = 1
-            else:
-                self._fhandle.write(c)
-                # nonprinting characters including tabs are not counted for WIDTH
-                if c >= b' ':
-                    self.col += 1
-                    # col-1 is a byte that wraps
-                    if self.col == 257:
-                        self.col = 1
+        # don't replace CR or LF with CRLF when writing to files
+        self._fhandle.write(s)
+        # count columns from the last CR
+        head, cr, tail = s.rpartition(b'\r')
+        if cr:
+            self.col = 1
+        # col-1 is a byte that wraps
+        self.col = (self.col - 1 + _printing_width(tail)) % 256 + 1
 
     def write_line(self, s=b''):
         """Write string and follow with device-standard line break."""
@@ -655,7 +652,19 @@ class SCRNFile(RawFile):
             self.screen.write_line(do_echo=do_echo)
             self._col = 1
         cwidth = self.screen.mode.width
-        for c in iterchar(s):
+        pos = 0
+        while pos < len(s):
+            if self._is_master and self.width == cwidth:
+                # printable chars that fit on the current row can be sent in one go,
+                # with the same effect as sending them one by one
+                run = PRINTABLE_RUN.match(s, pos, pos + self.screen.get_space_on_row())
+                if run:
+                    self.screen.write(run.group(), do_echo=do_echo)
+                    self._col += run.end() - pos
+                    pos = run.end()
+                    continue
+            c = s[pos:pos+1]
+            pos += 1
             if self.width <= cwidth and self.col > self.width:
                 self.screen.write_line(do_echo=do_echo)
                 self._col = 1
@@ -176,7 +176,7 @@ def dos_is_legal_name(dos_name):
             ((set(trunk) | set(ext)) <= ALLOWABLE_CHARS)
         )
 
-def dos_to_native_name(native_path, dosname, isdir):
+def dos_to_native_name(native_path, dosname, isdir, dir_cache):
     """Find a matching native file name for a given normalised DOS name."""
     try:
         uni_name = dosname.decode('ascii')
@@ -188,26 +188,20 @@ def dos_to_native_name(native_path, dosname, isdir):
         return uni_name
     # otherwise try in lexicographic order
     try:
-        all_names = os.listdir(native_path)
+        candidates = dir_cache.get_matches(native_path, dosname)
     except EnvironmentError:
         # report no match if listdir fails
         return None
-    for f in sorted(all_names):
-        # we won't match non-ascii anyway
-        try:
-            ascii_name = f.encode('ascii')
-        except UnicodeEncodeError:
-            continue
-        # don't match long names or non-legal dos names
-        if dos_is_legal_name(ascii_name):
-            try_name = dos_normalise_name(ascii_name)
-            if try_name == dosname and istype(native_path, f, isdir):
-                return f
+    for f in candidates:
+        if istype(native_path, f, isdir):
+            return f
     return None
 
-def dos_name_matches(name, mask):
-    """Whether native name element matches DOS wildcard mask."""
-    # convert wildcard mask to regexp
+# compiled regular expressions for DOS wildcard masks
+_MASK_REGEXPS = {}
+
+def _compile_mask(mask):
+    """Convert DOS wildcard mask to compiled regexp."""
     regexp = b'\\A'
     for c in iterchar(mask.upper()):
         if c == b'?':
@@ -218,7 +212,14 @@ def dos_name_matches(name, mask):
         else:
             regexp += re.escape(c)
     regexp += b'\\Z'
-    cregexp = re.compile(regexp)
+    return re.compile(regexp)
+
+def dos_name_matches(name, mask):
+    """Whether native name element matches DOS wildcard mask."""
+    try:
+        cregexp = _MASK_REGEXPS[mask]
+    except KeyError:
+        cregexp = _MASK_REGEXPS[mask] = _compile_mask(mask)
     return cregexp.match(name.upper()) is not None
 
 
@@ -230,7 +231,9 @@ class DiskDevice(object):
 
     allowed_modes = b'IOR'
 
-    def __init__(self, letter, path, cwd, codepage, text_mode, soft_linefeed):
+    def __init__(
+            self, letter, path, cwd, codepage, text_mode, soft_linefeed, map_random_files=False
+        ):
         """Initialise a disk device."""
         assert isinstance(cwd, text_type), type(cwd)
         # DOS drive letter
@@ -254,6 +257,10 @@ class DiskDevice(object):
         # text file settings
         self._text_mode = text_mode
         self._soft_linefeed = soft_linefeed
+        # access random files through a memory map
+        self._map_random_files = map_random_files
+        # directory listings for name matching
+        self._dir_cache = DirectoryCache()
 
     def close(self):
         """Close disk device."""
@@ -289,9 +296,9 @@ class DiskDevice(object):
                 )
             else:
                 # if the input stream is unicode: encode codepage bytes
-                # replace newlines with \r in text mode
+                # replace newlines with \r in text mode, but leave random-access records alone
                 fhandle = self._codepage.wrap_input_stream(
-                    fhandle, replace_newlines=not self._soft_linefeed
+                    fhandle, replace_newlines=not self._soft_linefeed and mode != b'R'
                 )
         if filetype in b'BPM':
             # binary [B]LOAD, [B]SAVE
@@ -305,7 +312,9 @@ class DiskDevice(object):
                 return TextFile(fhandle, filetype, number, mode, self._locks)
             else:
                 # data file for random
-                return RandomFile(fhandle, number, field, reclen, self._locks)
+                return RandomFile(
+                    fhandle, number, field, reclen, self._locks, self._map_random_files
+                )
         else:
             # incorrect file type requested
             msg = b'Incorrect file type %s requested for mode %s' % (filetype, mode)
@@ -356,6 +365,9 @@ class DiskDevice(object):
             # OUTPUT mode files are created anyway since they're opened with wb
             if ((mode == b'A' or mode == b'R') and not os.path.exists(native_name)):
                 io.open(native_name, 'wb').close()
+            if mode != b'I':
+                # we may have created a file
+                self._dir_cache.invalidate()
             if mode == b'A':
                 f = io.open(native_name, 'r+b')
                 # APPEND mode is only valid for text files (which are seekable);
@@ -454,10 +466,12 @@ class DiskDevice(object):
     def mkdir(self, dos_path):
         """Create directory at given BASIC path."""
         safe(os.mkdir, self._get_native_abspath(dos_path, defext=b'', isdir=True, create=True))
+        self._dir_cache.invalidate()
 
     def rmdir(self, dos_path):
         """Remove directory at given BASIC path."""
         safe(os.rmdir, self._get_native_abspath(dos_path, defext=b'', isdir=True, create=False))
+        self._dir_cache.invalidate()
 
     def kill(self, dos_pathmask):
         """Remove regular files that match given BASIC path and mask."""
@@ -481,7 +495,7 @@ class DiskDevice(object):
             for _dos_name in to_kill_dos
             if (
                 dos_is_legal_name(_dos_name) and
-                not is_hidden(os.path.join(native_dir, dos_to_native[_dos_name]))
+                not self._dir_cache.is_hidden(native_dir, dos_to_native[_dos_name])
             )
         ]
         if not to_kill:
@@ -489,8 +503,11 @@ class DiskDevice(object):
         for dos_path in to_kill_dos:
             # don't delete open files
             self.require_file_not_open(dos_path)
-        for native_path in to_kill:
-            safe(os.remove, native_path)
+        try:
+            for native_path in to_kill:
+                safe(os.remove, native_path)
+        finally:
+            self._dir_cache.invalidate()
 
     def rename(self, old_dospath, new_dospath):
         """Rename a file or directory."""
@@ -503,6 +520,7 @@ class DiskDevice(object):
         if os.path.exists(new_native_path):
             raise error.BASICError(error.FILE_ALREADY_EXISTS)
         safe(os.rename, old_native_path, new_native_path)
+        self._dir_cache.invalidate()
 
     def _split_pathmask(self, dos_pathmask):
         """Split pathmask into path and mask."""
@@ -523,10 +541,7 @@ class DiskDevice(object):
 
     def _get_dirs_files(self, native_path):
         """Get native filenames for native path."""
-        all_names = safe(os.listdir, native_path)
-        dirs = [n for n in all_names if os.path.isdir(os.path.join(native_path, n))]
-        fils = [n for n in all_names if not os.path.isdir(os.path.join(native_path, n))]
-        return dirs, fils
+        return safe(self._dir_cache.get_dirs_files, native_path)
 
     def listdir(self, pathmask):
         """Get directory listing."""
@@ -538,8 +553,8 @@ class DiskDevice(object):
         else:
             dirs, fils = self._get_dirs_files(native_path)
             # remove hidden files
-            dirs = [d for d in dirs if not is_hidden(os.path.join(native_path, d))]
-            fils = [f for f in fils if not is_hidden(os.path.join(native_path, f))]
+            dirs = [d for d in dirs if not self._dir_cache.is_hidden(native_path, d)]
+            fils = [f for f in fils if not self._dir_cache.is_hidden(native_path, f)]
             # filter according to mask
             dirs = self._filter_names(native_path, dirs + [u'.', u'..'], dos_mask)
             fils = self._filter_names(native_path, fils, dos_mask)
@@ -624,7 +639,7 @@ class DiskDevice(object):
         # check for non-legal characters & spaces (but clip off overlong names)
         if not dos_is_legal_name(norm_name):
             raise error.BASICError(error.BAD_FILE_NAME)
-        fullname = dos_to_native_name(native_path, norm_name, isdir)
+        fullname = dos_to_native_name(native_path, norm_name, isdir, self._dir_cache)
         if fullname:
             return fullname
         # not found
@@ -684,6 +699,88 @@ def istype(native_path, native_name, isdir):
         return False
 
 
+class DirectoryCache(object):
+    """Native directory listings and DOS name matches, kept per directory."""
+
+    def __init__(self):
+        """Initialise the cache."""
+        self._entries = {}
+
+    def invalidate(self):
+        """Drop all cached listings; call after creating, renaming or removing files."""
+        self._entries.clear()
+
+    def _get_entry(self, native_path):
+        """Get the listing for a native directory, rereading it if modified."""
+        # stat before listing, so that a change in between leads to a reread next time
+        mtime = os.stat(native_path).st_mtime
+        entry = self._entries.get(native_path)
+        if entry is None or entry.mtime != mtime:
+            entry = _DirectoryEntry(native_path, mtime)
+            self._entries[native_path] = entry
+        return entry
+
+    def get_matches(self, native_path, dos_name):
+        """Get native names in lexicographic order that normalise to a given DOS name."""
+        return self._get_entry(native_path).get_matches(dos_name)
+
+    def get_dirs_files(self, native_path):
+        """Get lists of native subdirectory and file names."""
+        return self._get_entry(native_path).get_dirs_files()
+
+    def is_hidden(self, native_path, native_name):
+        """Native file in native directory is hidden."""
+        return self._get_entry(native_path).is_hidden(native_name)
+
+
+class _DirectoryEntry(object):
+    """Listing of a single native directory."""
+
+    def __init__(self, native_path, mtime):
+        """Read the directory."""
+        self.mtime = mtime
+        self._native_path = native_path
+        self._names = os.listdir(native_path)
+        # determined when first needed
+        self._dos_names = None
+        self._isdir = None
+        self._hidden = {}
+
+    def get_matches(self, dos_name):
+        """Get native names in lexicographic order that normalise to a given DOS name."""
+        if self._dos_names is None:
+            self._dos_names = {}
+            for f in sorted(self._names):
+                # we won't match non-ascii anyway
+                try:
+                    ascii_name = f.encode('ascii')
+                except UnicodeEncodeError:
+                    continue
+                # don't match long names or non-legal dos names
+                if dos_is_legal_name(ascii_name):
+                    self._dos_names.setdefault(dos_normalise_name(ascii_name), []).append(f)
+        return self._dos_names.get(dos_name, ())
+
+    def get_dirs_files(self):
+        """Get lists of native subdirectory and file names."""
+        if self._isdir is None:
+            self._isdir = {
+                n: os.path.isdir(os.path.join(self._native_path, n)) for n in self._names
+            }
+        dirs = [n for n in self._names if self._isdir[n]]
+        fils = [n for n in self._names if not self._isdir[n]]
+        return dirs, fils
+
+    def is_hidden(self, native_name):
+        """Native file is hidden."""
+        try:
+            return self._hidden[native_name]
+        except KeyError:
+            hidden = is_hidden(os.path.join(self._native_path, native_name))
+            self._hidden[native_name] = hidden
+            return hidden
+
+
 ##############################################################################
 # Internal disk and bound files
 
@@ -756,10 +853,14 @@ class NameWrapper(object):
 class InternalDiskDevice(DiskDevice):
     """Internal disk device for special operations."""
 
-    def __init__(self, letter, path, cwd, codepage, text_mode, soft_linefeed):
+    def __init__(
+            self, letter, path, cwd, codepage, text_mode, soft_linefeed, map_random_files=False
+        ):
         """Initialise internal disk."""
         self._bound_files = {}
-        DiskDevice.__init__(self, letter, path, cwd, codepage, text_mode, soft_linefeed)
+        DiskDevice.__init__(
+            self, letter, path, cwd, codepage, text_mode, soft_linefeed, map_random_files
+        )
 
     def bind(self, file_name_or_object, name=None):
         """Bind a native file name or object to an internal name."""
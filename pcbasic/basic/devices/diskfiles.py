@@ -6,6 +6,10 @@ Disk Files
 This file is released under the GNU GPL version 3 or later.
 """
 
+import io
+import os
+import mmap
+import bisect
 import struct
 import ntpath
 from contextlib import contextmanager
@@ -27,6 +31,9 @@ from .devicebase import RawFile, TextFileBase, InputMixin, safe_io, TYPE_TO_MAGI
 #   lock()
 #   unlock()
 
+# size of read-ahead blocks for text files
+READ_CHUNK = 0x10000
+
 
 class BinaryFile(RawFile):
     """File class for binary (B, P, M) files on disk device."""
@@ -74,6 +81,8 @@ class TextFile(TextFileBase, InputMixin):
         TextFileBase.__init__(self, fhandle, filetype, mode)
         self._locks = locks
         self._number = number
+        # read-ahead buffer: block of file contents and position of next byte to be read
+        self._readahead, self._readpos = b'', 0
         # in append mode, we need to start at end of file
         if self.mode == b'A':
             with safe_io():
@@ -88,10 +97,40 @@ class TextFile(TextFileBase, InputMixin):
         TextFileBase.close(self)
         self._locks.close_file(self._number)
 
-    def read(self, n):
+    def _buffered(self):
+        """Number of bytes read ahead but not yet consumed."""
+        return len(self._readahead) - self._readpos
+
+    def peek(self, num):
+        """Return next num characters to be read; never returns more, fewer only at EOF."""
+        if self._buffered() < num:
+            # keep unconsumed bytes and read ahead by whole blocks
+            chunks = [self._readahead[self._readpos:]]
+            length = len(chunks[0])
+            with safe_io():
+                while length < num:
+                    chunk = self._fhandle.read(max(num - length, READ_CHUNK))
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    length += len(chunk)
+            self._readahead, self._readpos = b''.join(chunks), 0
+        return self._readahead[self._readpos:self._readpos+num]
+
+    def read(self, num):
         """Read num characters."""
         self._locks.try_access(self._number, b'R')
-        return TextFileBase.read(self, n)
+        output = self.peek(num)
+        # check for \x1A - EOF char will actually stop further reading
+        if b'\x1A' in output:
+            output = output[:output.index(b'\x1A')]
+        self._readpos += len(output)
+        if len(output) <= 1:
+            self._previous = self._current
+        else:
+            self._previous = output[-2:]
+        self._current = output[-1:]
+        return output
 
     def read_one(self):
         """Read one character, replacing CR LF with CR."""
@@ -108,17 +147,36 @@ class TextFile(TextFileBase, InputMixin):
 
     def read_line(self):
         """Read line from text file, break on CR or CRLF (not LF)."""
-        s = []
-        while True:
-            c = self.read_one()
-            if not c or (c == b'\r' and self._previous != b'\n'):
-                # break on CR, CRLF but allow LF, LFCR to pass
-                break
-            s.append(c)
-            if len(s) == 255:
-                c = b'\r' if self.peek(1) == b'\r' else None
-                break
-        return b''.join(s), c
+        self._locks.try_access(self._number, b'R')
+        # enough for a full line and its CR LF
+        data = self.peek(257)
+        if b'\x1A' in data:
+            data = data[:data.index(b'\x1A')]
+        # break on CR, CRLF but allow LF, LFCR to pass
+        end = data.find(b'\r')
+        while end > 0 and data[end-1:end] == b'\n' or end == 0 and self._current == b'\n':
+            end = data.find(b'\r', end + 1)
+        if 0 <= end < 255:
+            line = data[:end]
+            self._readpos += end + 1
+            if end:
+                self._previous = data[end-1:end]
+            else:
+                self._previous = self._current
+            self._current = b'\r'
+            # report CRLF as CR
+            if data[end+1:end+2] == b'\n':
+                self._readpos += 1
+            return line, b'\r'
+        elif len(data) >= 255:
+            line = data[:255]
+            self._readpos += 255
+            self._previous, self._current = line[-2:-1], line[-1:]
+            return line, (b'\r' if self.peek(1) == b'\r' else None)
+        # end of file
+        self._readpos += len(data)
+        self._previous, self._current = (data[-1:] or self._current), b''
+        return data, b''
 
     def write(self, s, can_break=True):
         """Write string to file."""
@@ -133,7 +191,7 @@ class TextFile(TextFileBase, InputMixin):
         """Get file pointer (LOC)."""
         with safe_io():
             if self.mode == b'I':
-                tell = self._fhandle.tell() - len(self._readahead)
+                tell = self._fhandle.tell() - self._buffered()
                 return max(1, (127+tell) // 128)
             return self._fhandle.tell() // 128
 
@@ -195,15 +253,15 @@ class FieldFile(TextFile):
             self._fhandle.flush()
             self.mode = b'I'
         elif new_mode == b'O' and self.mode == b'I':
-            self._fhandle.seek(-len(self._readahead), 1)
-            self._readahead = []
+            self._fhandle.seek(-self._buffered(), 1)
+            self._readahead, self._readpos = b'', 0
             self._previous, self._current = b'', b''
             self.mode = b'O'
 
     def _check_overflow(self):
         """Check for FIELD OVERFLOW."""
         # FIELD overflow happens if last byte in record has been read or written
-        if self._fhandle.tell() - len(self._readahead) >= self._reclen:
+        if self._fhandle.tell() - self._buffered() >= self._reclen:
             raise error.BASICError(error.FIELD_OVERFLOW)
 
     def set_buffer(self, contents):
@@ -233,7 +291,7 @@ class FieldFile(TextFile):
 class RandomFile(RawFile):
     """Random-access file on disk device."""
 
-    def __init__(self, fhandle, number, field, reclen, locks):
+    def __init__(self, fhandle, number, field, reclen, locks, use_map=False):
         """Initialise random-access file."""
         # note that for random files, output_stream must be a seekable stream.
         RawFile.__init__(self, fhandle, b'D', b'R')
@@ -247,12 +305,41 @@ class RandomFile(RawFile):
         # position at start of file
         self._recpos = 0
         self._fhandle.seek(0)
+        # if requested and the stream is a disk file, access it through a memory map
+        # note that PUT then writes through immediately, rather than when the file is flushed
+        self._map, self._length = None, 0
+        self._mapped = use_map and isinstance(self._fhandle, io.BufferedRandom)
+        if self._mapped:
+            try:
+                self._map_file()
+            except (EnvironmentError, ValueError):
+                # e.g. devices and special files; fall back to stream access
+                self._mapped = False
 
     def close(self):
         """Close random-access file."""
+        if self._map is not None:
+            self._map.close()
         RawFile.close(self)
         self._locks.close_file(self._number)
 
+    def _map_file(self):
+        """Map the file into memory and cache its length."""
+        self._fhandle.flush()
+        fileno = self._fhandle.fileno()
+        self._length = os.fstat(fileno).st_size
+        # an empty file can't be mapped
+        self._map = mmap.mmap(fileno, 0) if self._length else None
+
+    def _resize(self, length):
+        """Extend the file and its memory map."""
+        with safe_io():
+            if self._map is not None:
+                self._map.close()
+            # fills the extension with NUL
+            self._fhandle.truncate(length)
+            self._map_file()
+
     ##########################################################################
     # field text file operations
 
@@ -312,8 +399,17 @@ class RandomFile(RawFile):
         self._set_record_pos(pos)
         # exceptionally, GET is allowed if the file holding the lock is open for OUTPUT
         self._locks.try_record_access(self._number, self._recpos+1, self._recpos+1, b'R')
+        start = self._recpos * self.reclen
+        if self._mapped and start + self.reclen > self._length:
+            # the file may have been extended through another file number
+            with safe_io():
+                length = os.fstat(self._fhandle.fileno()).st_size
+            if length > self._length:
+                self._resize(length)
         if self.eof():
             contents = b'\0' * self.reclen
+        elif self._mapped:
+            contents = self._map[start:start+self.reclen] if self._map is not None else b''
         else:
             with safe_io():
                 contents = self._fhandle.read(self.reclen)
@@ -325,21 +421,30 @@ class RandomFile(RawFile):
         """Write a record."""
         self._set_record_pos(pos)
         self._locks.try_record_access(self._number, self._recpos+1, self._recpos+1, b'W')
-        current_length = self.lof()
-        with safe_io():
-            if self._recpos > current_length:
-                self._fhandle.seek(0, 2)
-                numrecs = self._recpos - current_length
-                self._fhandle.write(b'\0' * numrecs * self.reclen)
-            self._fhandle.write(bytes(self._field_file.get_buffer()))
+        start = self._recpos * self.reclen
+        # the FIELD buffer may be longer than the record
+        contents = bytes(self._field_file.get_buffer()[:self.reclen])
+        if self._mapped:
+            if start + self.reclen > self._length:
+                self._resize(start + self.reclen)
+            self._map[start:start+self.reclen] = contents
+        else:
+            current_length = self.lof()
+            with safe_io():
+                if start > current_length:
+                    # pad with NUL up to the record
+                    self._fhandle.seek(0, 2)
+                    self._fhandle.write(b'\0' * (start - current_length))
+                self._fhandle.write(contents)
         self._recpos += 1
 
     def _set_record_pos(self, pos):
         """Move record pointer to new position."""
         if pos is not None:
             # first record is number 1
-            with safe_io():
-                self._fhandle.seek((pos-1) * self.reclen)
+            if not self._mapped:
+                with safe_io():
+                    self._fhandle.seek((pos-1) * self.reclen)
             self._recpos = pos - 1
 
     def loc(self):
@@ -348,6 +453,8 @@ class RandomFile(RawFile):
 
     def lof(self):
         """Get length of file, in bytes, for LOF."""
+        if self._mapped:
+            return self._length
         with safe_io():
             current = self._fhandle.tell()
             self._fhandle.seek(0, 2)
@@ -368,16 +475,94 @@ class RandomFile(RawFile):
 # Locks
 
 
+# sets of access or lock characters, by access or lock type string
+_CHAR_SETS = {}
+
+def _char_set(chars):
+    """Get the set of characters in an access or lock type string."""
+    try:
+        return _CHAR_SETS[chars]
+    except KeyError:
+        char_set = _CHAR_SETS[chars] = frozenset(iterchar(chars or b''))
+        return char_set
+
+
+class RecordLocks(object):
+    """Index of the locked record ranges of a file."""
+
+    def __init__(self):
+        """Initialise empty index."""
+        # whole file is locked
+        self._whole_file = False
+        # locked ranges, sorted by start record
+        self._ranges = []
+        self._starts = []
+        # greatest stop record among the ranges up to and including each index
+        self._reach = []
+
+    def locked(self):
+        """Any lock is held."""
+        return self._whole_file or bool(self._ranges)
+
+    def contains(self, record):
+        """Record is in a locked range."""
+        if self._whole_file:
+            return True
+        index = bisect.bisect_right(self._starts, record)
+        return index > 0 and self._reach[index-1] >= record
+
+    def add(self, start, stop):
+        """Lock a range of records, or the whole file if range is None, None."""
+        if start is None and stop is None:
+            self._whole_file = True
+            return
+        index = bisect.bisect_left(self._ranges, (start, stop))
+        if self._ranges[index:index+1] != [(start, stop)]:
+            self._ranges.insert(index, (start, stop))
+            self._starts.insert(index, start)
+            self._reach.insert(index, stop)
+            self._update_reach(index)
+
+    def remove(self, start, stop):
+        """Unlock a range of records; raise KeyError if not locked with exactly this range."""
+        if start is None and stop is None:
+            if not self._whole_file:
+                raise KeyError((start, stop))
+            self._whole_file = False
+            return
+        index = bisect.bisect_left(self._ranges, (start, stop))
+        if self._ranges[index:index+1] != [(start, stop)]:
+            raise KeyError((start, stop))
+        del self._ranges[index]
+        del self._starts[index]
+        del self._reach[index]
+        self._update_reach(index)
+
+    def _update_reach(self, index):
+        """Recalculate greatest stop records from index onwards."""
+        reach = self._reach[index-1] if index > 0 else None
+        for i in range(index, len(self._ranges)):
+            stop = self._ranges[i][1]
+            reach = stop if reach is None or stop > reach else reach
+            self._reach[i] = reach
+
+
 class LockingParameters(object):
     """Record of a file's locking parameters."""
 
     def __init__(self, dos_name, mode, lock_type, access):
         """Build a record."""
         self.name = ntpath.basename(dos_name).upper()
-        self.lock_set = set()
+        self.record_locks = RecordLocks()
         self.lock_type = lock_type
         self.access = access
         self.mode = mode
+        # access allowed to this file and denied to others
+        self.access_set = _char_set(access)
+        if lock_type and lock_type != b'SHARED':
+            self.denied_set = _char_set(lock_type)
+        else:
+            self.denied_set = frozenset()
 
 
 class Locks(object):
@@ -387,12 +572,18 @@ class Locks(object):
         """Initialise locks."""
         # dict of LockingParameters objects, one for each open disk file, by file number
         self._locking_parameters = {}
+        # dicts of LockingParameters objects by file number, by normalised file name
+        self._by_name = {}
 
     def list_open(self, name, exclude_number=None):
         """Retrieve a list of files open on the same disk device."""
+        return self._list_open(ntpath.basename(name).upper(), exclude_number)
+
+    def _list_open(self, norm_name, exclude_number=None):
+        """Retrieve a list of open files by normalised name."""
         return [
-            f for number, f in iteritems(self._locking_parameters)
-            if f.name == ntpath.basename(name).upper() and number != exclude_number
+            f for number, f in iteritems(self._by_name.get(norm_name, {}))
+            if number != exclude_number
         ]
 
     def open_file(self, name, number, mode, lock_type, access):
@@ -431,14 +622,21 @@ class Locks(object):
         # but second file gets checked for ''
         if lock_type and not access:
             access = b'RW'
-        self._locking_parameters[number] = LockingParameters(name, mode, lock_type, access)
+        self.close_file(number)
+        this_file = LockingParameters(name, mode, lock_type, access)
+        self._locking_parameters[number] = this_file
+        self._by_name.setdefault(this_file.name, {})[number] = this_file
 
     def close_file(self, number):
         """Deregister disk file."""
         try:
-            del self._locking_parameters[number]
+            this_file = self._locking_parameters.pop(number)
         except KeyError:
-            pass
+            return
+        same_name = self._by_name[this_file.name]
+        del same_name[number]
+        if not same_name:
+            del self._by_name[this_file.name]
 
     def try_access(self, number, access):
         """Attempt to access a file."""
@@ -446,12 +644,12 @@ class Locks(object):
             return
         this_file = self._locking_parameters[number]
         # access in violation of ACCESS declaration in OPEN: path/file access error
-        if this_file.access and not (set(access) & set(this_file.access)):
+        access_set = _char_set(access)
+        if this_file.access and not (access_set & this_file.access_set):
             raise error.BASICError(error.PATH_FILE_ACCESS_ERROR)
         # access in violation of other's LOCK declation in OPEN: path/file access error
-        others = self.list_open(this_file.name, number)
-        for f in others:
-            if (f.lock_type and f.lock_type != b'SHARED' and (set(f.lock_type) & set(access))):
+        for f in self._list_open(this_file.name, number):
+            if f.denied_set & access_set:
                 raise error.BASICError(error.PATH_FILE_ACCESS_ERROR)
 
     def try_record_access(self, number, start, stop, access=b'RW'):
@@ -462,38 +660,30 @@ class Locks(object):
     def _try_record_lock(self, number, start, stop, allow_self=True, read_only=False):
         """Attempt to access a record."""
         this_file = self._locking_parameters[number]
-        other_locks = [
-            f.lock_set for f in self.list_open(this_file.name, number if allow_self else None)
+        for f in self._list_open(this_file.name, number if allow_self else None):
             # access parameter only exists to allow reading a record on locked OUTPUT file
-            if not (f.mode in b'OA' and read_only)
-        ]
-        other_lock_set = set.union(*other_locks) if other_locks else set()
-        # access in violation of other's LOCK#: permission denied
-        # whole-file access sought
-        if stop is None and start is None:
-            if other_lock_set:
-                raise error.BASICError(error.PERMISSION_DENIED)
-        else:
-            # range access sought
-            for start_1, stop_1 in other_lock_set:
-                if (
-                        stop_1 is None and start_1 is None
-                        or (start >= start_1 and start <= stop_1)
-                        or (stop >= start_1 and stop <= stop_1)
-                    ):
+            if f.mode in b'OA' and read_only:
+                continue
+            # access in violation of other's LOCK#: permission denied
+            if stop is None and start is None:
+                # whole-file access sought
+                if f.record_locks.locked():
                     raise error.BASICError(error.PERMISSION_DENIED)
+            elif f.record_locks.contains(start) or f.record_locks.contains(stop):
+                # range access sought
+                raise error.BASICError(error.PERMISSION_DENIED)
 
     def acquire_record_lock(self, number, start, stop):
         """Acquire a lock on a range of records."""
         self._try_record_lock(number, start, stop, allow_self=False)
         this_file = self._locking_parameters[number]
-        this_file.lock_set.add((start, stop))
+        this_file.record_locks.add(start, stop)
 
     def release_record_lock(self, number, start, stop):
         """Acquire a lock on a range of records."""
         this_file = self._locking_parameters[number]
         # permission denied if the exact record range wasn't given before
         try:
-            this_file.lock_set.remove((start, stop))
+            this_file.record_locks.remove(start, stop)
         except KeyError:
             raise error.BASICError(error.PERMISSION_DENIED)
@@ -45,7 +45,7 @@ class Files(object):
             self, values, memory, queues, keyboard, display,
             max_files, max_reclen, serial_buffer_size,
             device_params, current_device, mount_dict,
-            text_mode, soft_linefeed
+            text_mode, soft_linefeed, map_random_files
         ):
         """Initialise files."""
         # for wait() in files_
@@ -58,7 +58,7 @@ class Files(object):
         self._init_devices(
             values, queues, display, keyboard,
             device_params, current_device, mount_dict,
-            serial_buffer_size, text_mode, soft_linefeed
+            serial_buffer_size, text_mode, soft_linefeed, map_random_files
         )
 
     ###########################################################################
@@ -128,7 +128,7 @@ class Files(object):
     def _init_devices(
             self, values, queues, display, keyboard,
             device_params, current_device, mount_dict,
-            serial_in_size, text_mode, soft_linefeed
+            serial_in_size, text_mode, soft_linefeed, map_random_files
         ):
         """Initialise devices."""
         # screen device, for files_()
@@ -156,7 +156,9 @@ class Files(object):
         self.kybd_file = self._devices[b'KYBD:'].device_file
         self.lpt1_file = self._devices[b'LPT1:'].device_file
         # disks
-        self._init_disk_devices(mount_dict, current_device, codepage, text_mode, soft_linefeed)
+        self._init_disk_devices(
+            mount_dict, current_device, codepage, text_mode, soft_linefeed, map_random_files
+        )
 
     def close_devices(self):
         """Close device master files."""
@@ -568,7 +570,7 @@ class Files(object):
 
     def _init_disk_devices(
             self, mount_dict, current_device,
-            codepage, text_mode, soft_linefeed
+            codepage, text_mode, soft_linefeed, map_random_files
         ):
         """Initialise disk devices."""
         # use None to request default mounts, use {} for no mounts
@@ -585,7 +587,7 @@ class Files(object):
             # treat device @: separately - internal disk
             disk_class = disk.InternalDiskDevice if letter == b'@' else disk.DiskDevice
             self._devices[letter + b':'] = disk_class(
-                letter, path, cwd, codepage, text_mode, soft_linefeed
+                letter, path, cwd, codepage, text_mode, soft_linefeed, map_random_files
             )
         # allow upper or lower case, unicode or bytes, with or without :
         if isinstance(current_device, text_type):
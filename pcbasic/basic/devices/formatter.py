@@ -6,6 +6,9 @@ Formatted output handling
 This file is released under the GNU GPL version 3 or later.
 """
 
+from collections import OrderedDict
+
+from ...compat import iterchar
 from ..base import codestream
 from ..base import error
 from ..base import tokens as tk
@@ -82,39 +85,20 @@ class Formatter(object):
         format_expr = values.next_string(args)
         if format_expr == b'':
             raise error.BASICError(error.IFC)
-        fors = codestream.CodeStream(format_expr)
+        format_list = compile_format(format_expr)
         newline, format_chars = True, False
-        start_cycle = True
-        initial_literal = b''
         try:
             while True:
-                c = fors.peek()
-                if c == b'':
-                    if not format_chars:
-                        # avoid infinite loop
-                        break
-                    # loop the format string if more variables to come
-                    start_cycle = True
-                    initial_literal = b''
-                    fors.seek(0)
-                elif c == b'_':
-                    # escape char; write next char in fors or _ if this is the last char
+                start_cycle = True
+                initial_literal = b''
+                for literal, format_field in format_list:
                     if start_cycle:
-                        initial_literal += fors.read(2)[-1:]
+                        initial_literal += literal
                     else:
-                        self._output.write(fors.read(2)[-1:])
-                else:
-                    try:
-                        format_field = StringField(fors)
-                    except ValueError:
-                        try:
-                            format_field = NumberField(fors)
-                        except ValueError:
-                            if start_cycle:
-                                initial_literal += fors.read(1)
-                            else:
-                                self._output.write(fors.read(1))
-                            continue
+                        for c in iterchar(literal):
+                            self._output.write(c)
+                    if format_field is None:
+                        continue
                     value = next(args)
                     if value is None:
                         newline = False
@@ -124,6 +108,12 @@ class Formatter(object):
                         start_cycle = False
                         format_chars = True
                     self._output.write(format_field.format(value))
+                else:
+                    if format_chars:
+                        # loop the format string if more variables to come
+                        continue
+                # end of statement; or no format chars, avoid infinite loop
+                break
         except StopIteration:
             pass
         if not format_chars:
@@ -133,6 +123,54 @@ class Formatter(object):
         return newline
 
 
+##############################################################################
+# format string compiler
+
+# maximum number of compiled format strings to keep
+FORMAT_CACHE_SIZE = 64
+
+# compiled format strings, least recently used first
+_format_cache = OrderedDict()
+
+def compile_format(format_expr):
+    """Get the list of (literal, field) pairs for a format string; field may be None."""
+    try:
+        format_list = _format_cache.pop(format_expr)
+    except KeyError:
+        format_list = _parse_format(format_expr)
+        if len(_format_cache) >= FORMAT_CACHE_SIZE:
+            _format_cache.popitem(last=False)
+    _format_cache[format_expr] = format_list
+    return format_list
+
+def _parse_format(format_expr):
+    """Split a format string into literals and formatting fields."""
+    fors = codestream.CodeStream(format_expr)
+    format_list = []
+    literal = b''
+    while True:
+        c = fors.peek()
+        if c == b'':
+            break
+        elif c == b'_':
+            # escape char; literal next char in fors or _ if this is the last char
+            literal += fors.read(2)[-1:]
+        else:
+            try:
+                format_field = StringField(fors)
+            except ValueError:
+                try:
+                    format_field = NumberField(fors)
+                except ValueError:
+                    literal += fors.read(1)
+                    continue
+            format_list.append((literal, format_field))
+            literal = b''
+    if literal or not format_list:
+        format_list.append((literal, None))
+    return format_list
+
+
 ##############################################################################
 # formatting functions and format string parsers
 
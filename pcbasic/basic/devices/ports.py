@@ -7,13 +7,15 @@ This file is released under the GNU GPL version 3 or later.
 """
 
 import logging
+import threading
+import time
 import sys
 import os
 import datetime
 import io
 from contextlib import contextmanager
 
-from ...compat import iteritems
+from ...compat import iteritems, iterchar
 from ...compat import console, stdin, stdout
 
 from .devicebase import safe_io
@@ -35,6 +37,12 @@ from .devicebase import Device, DeviceSettings, TextFileBase, RealTimeInputMixin
 from .devicebase import parse_protocol_string
 
 
+# timeout for blocking reads from a serial port, in seconds
+READ_TIMEOUT = 0.02
+# polling period for console input
+TICK = 0.002
+
+
 ###############################################################################
 # COM ports
 
@@ -51,6 +59,8 @@ class COMDevice(Device):
         self._serial_in_size = serial_in_size
         self._spec = arg
         self._serial = self._init_serial(arg)
+        # input buffer; keeps what has not been read when a file is closed
+        self._in_buffer = SerialBuffer(self._serial, serial_in_size)
         self.device_file = DeviceSettings()
         # only one file open at a time
         self._file = None
@@ -71,7 +81,10 @@ class COMDevice(Device):
         except Exception:
             self.close()
             raise
-        self._file = COMFile(self._serial, field, lf, self._serial_in_size, self._queues)
+        self._in_buffer.start()
+        self._file = COMFile(
+            self._serial, field, lf, self._serial_in_size, self._queues, self._in_buffer
+        )
         # inherit width settings from device file
         # note that these seem unused for COM files
         self._file.width = self.device_file.width
@@ -159,7 +172,7 @@ class COMDevice(Device):
             # so we need to ensure the serial port is opened before querying it
             if not self._serial.is_open:
                 self._serial.open()
-            return self._serial.in_waiting
+            return self._in_buffer.waiting()
 
     ##########################################################################
 
@@ -182,13 +195,13 @@ class COMDevice(Device):
                     # throws ValueError if too many :s, caught below
                     host, socket = val.split(u':')
                     url = u'%s://%s:%s' % (addr.lower(), host, socket)
-                    stream = serial.serial_for_url(url, timeout=0, do_not_open=True)
+                    stream = serial.serial_for_url(url, timeout=READ_TIMEOUT, do_not_open=True)
                     # monkey-patch serial object as SocketSerial does not have this property
                     stream.out_waiting = 0
                     return stream
                 elif addr == u'PORT':
                     # port can be e.g. /dev/ttyS1 on Linux or COM1 on Windows.
-                    return serial.serial_for_url(val, timeout=0, do_not_open=True)
+                    return serial.serial_for_url(val, timeout=READ_TIMEOUT, do_not_open=True)
                 else:
                     raise ValueError(u'Invalid protocol `%s`' % (addr,))
         except (ValueError, EnvironmentError) as e:
@@ -201,12 +214,15 @@ class COMDevice(Device):
         # which gets called after __getstate__() on shutdown
         pickle_dict = {k:v for k,v in iteritems(self.__dict__)}
         del pickle_dict['_serial']
+        # input waiting on the port is not kept either
+        del pickle_dict['_in_buffer']
         return pickle_dict
 
     def __setstate__(self, pickle_dict):
         """Initialise stream from pickling dict."""
         self.__dict__.update(pickle_dict)
         self._serial = self._init_serial(self._spec)
+        self._in_buffer = SerialBuffer(self._serial, self._serial_in_size)
 
     def _check_open(self):
         """Open the underlying port if necessary."""
@@ -291,6 +307,7 @@ class COMDevice(Device):
 
     def close(self):
         """Close the serial connection."""
+        self._in_buffer.stop()
         if self._serial and self._serial.is_open:
             logging.debug('Closing serial port %s.', self._serial.port)
             self._serial.close()
@@ -301,7 +318,7 @@ class COMDevice(Device):
         with safe_io(error.DEVICE_FAULT):
             self._check_open()
             # socketserial has no out_waiting, though Serial does
-            return self._serial.in_waiting > 0, self._serial.out_waiting > 0
+            return self._in_buffer.waiting() > 0, self._serial.out_waiting > 0
 
 
 ###############################################################################
@@ -309,7 +326,7 @@ class COMDevice(Device):
 class COMFile(TextFileBase, RealTimeInputMixin):
     """COMn: device - serial port."""
 
-    def __init__(self, stream, field, linefeed, serial_in_size, queues):
+    def __init__(self, stream, field, linefeed, serial_in_size, queues, in_buffer):
         """Initialise COMn: file."""
         TextFileBase.__init__(self, stream, b'D', b'R')
         self._queues = queues
@@ -317,6 +334,8 @@ class COMFile(TextFileBase, RealTimeInputMixin):
         self._field = field
         self._linefeed = linefeed
         self._serial_in_size = serial_in_size
+        # input buffer, filled in the background while the file is open
+        self._in_buffer = in_buffer
         self.is_open = True
 
     def close(self):
@@ -324,6 +343,8 @@ class COMFile(TextFileBase, RealTimeInputMixin):
         # do *not* call the parent close()
         # as this would call close() on our (unique) serial file handle
         #TextFileBase.close(self)
+        # unread input stays in the buffer, for ON COM and the next OPEN
+        self._in_buffer.stop()
         self.is_open = False
 
     def peek(self, num):
@@ -335,12 +356,14 @@ class COMFile(TextFileBase, RealTimeInputMixin):
         # take at most num chars out of readahead buffer (holds just one on COM but anyway)
         s, self._readahead = self._readahead[:num], self._readahead[num:]
         while len(s) < num:
-            self._queues.wait()
             with safe_io():
-                # non-blocking read
-                self._current, self._previous = self._fhandle.read(1), self._current
-            if self._current:
-                s.append(self._current)
+                # wait until input arrives, but keep handling events
+                chunk = self._in_buffer.read(num - len(s), self._queues.tick)
+            if chunk:
+                s.extend(iterchar(chunk))
+                self._previous, self._current = (chunk[-2:-1] or self._current), chunk[-1:]
+            else:
+                self._queues.check_events()
         logging.debug('Reading from serial port %s: %r', self._fhandle.port, b''.join(s))
         return b''.join(s)
 
@@ -394,7 +417,7 @@ class COMFile(TextFileBase, RealTimeInputMixin):
     def loc(self):
         """LOC: Returns number of chars waiting to be read."""
         with safe_io():
-            return self._fhandle.in_waiting
+            return self._in_buffer.waiting()
 
     def eof(self):
         """EOF: no chars waiting."""
@@ -403,8 +426,85 @@ class COMFile(TextFileBase, RealTimeInputMixin):
 
     def lof(self):
         """Returns number of bytes free in buffer."""
-        with safe_io():
-            return max(0, self._serial_in_size - self._fhandle.in_waiting)
+        return max(0, self._serial_in_size - self.loc())
+
+
+class SerialBuffer(object):
+    """Bounded input buffer, filled from a serial stream by a reader thread while a file is open."""
+
+    def __init__(self, stream, size):
+        """Initialise the buffer."""
+        self._stream = stream
+        self._size = size
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._error = None
+        self._stopped = True
+
+    def start(self):
+        """Launch a daemon thread to drain the stream."""
+        if not self._stopped:
+            return
+        self._error = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._fill, args=())
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the reader thread, keeping buffered input."""
+        if self._stopped:
+            return
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        # the thread notices when its read times out
+        self._thread.join()
+
+    def _fill(self):
+        """Move input from the stream to the buffer until stopped."""
+        while True:
+            with self._cond:
+                # if the buffer is full, leave input waiting on the port
+                while not self._stopped and len(self._buffer) >= self._size:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                free = self._size - len(self._buffer)
+            try:
+                # blocking read, with timeout
+                data = self._stream.read(1)
+                if data:
+                    data += self._stream.read(min(free - 1, self._stream.in_waiting))
+            except Exception as e:
+                # report to the reading end
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            if data:
+                with self._cond:
+                    self._buffer.extend(data)
+                    self._cond.notify_all()
+
+    def read(self, num, timeout):
+        """Take up to num bytes; wait at most timeout seconds for input to arrive."""
+        with self._cond:
+            if not self._buffer and not self._error:
+                self._cond.wait(timeout)
+            if not self._buffer and self._error:
+                raise self._error
+            data = bytes(self._buffer[:num])
+            del self._buffer[:num]
+            # wake up the reader thread if it was waiting for space
+            self._cond.notify_all()
+        return data
+
+    def waiting(self):
+        """Number of bytes in the buffer and waiting on the port."""
+        with self._cond:
+            return len(self._buffer) + self._stream.in_waiting
 
 
 ###############################################################################
@@ -432,6 +532,7 @@ class SerialStdIO(object):
         self.dtr = False
         self.break_condition = False
         self.port = u'STDIO'
+        self.timeout = READ_TIMEOUT
 
     def open(self):
         """Open a connection."""
@@ -442,7 +543,11 @@ class SerialStdIO(object):
         self.is_open = False
 
     def read(self, num=1):
-        """Non-blocking read of up to `num` chars from stdin."""
+        """Read up to `num` chars from stdin; wait at most `timeout` seconds for the first."""
+        # the console can only be polled
+        deadline = time.time() + self.timeout
+        while not console.key_pressed() and time.time() < deadline:
+            time.sleep(TICK)
         s = []
         # note that kbhit assumes keyboard
         # so won't work with redirects on Windows
@@ -13,6 +13,7 @@ except ImportError:
 
 import math
 
+from ...compat import iteritems
 from ..base import error
 from ..base import tokens as tk
 from ..base import signals
@@ -122,6 +123,9 @@ class Drawing(object):
         self.last_attr = None
         self.draw_scale = None
         self.draw_angle = None
+        # changed screen areas not yet sent to the interface, by page: [page, x0, y0, x1, y1]
+        self._damage = {}
+        queues.add_video_batcher(self)
 
     def init_mode(self, mode, text, pixels):
         """Initialise for new graphics mode."""
@@ -168,6 +172,12 @@ class Drawing(object):
         row, col = self._mode.pixel_to_text_pos(x, y)
         # use attr = 0 ?
         if col >= 1 and row >= 1 and col <= self._mode.width and row <= self._mode.height:
+            # if there's no text here, we've sent this before
+            if (
+                    self._text.get_char(self._apagenum, row, col) == 32
+                    and self._text.get_attr(self._apagenum, row, col) == self._attr
+                ):
+                return
             self._text.put_char_attr(self._apagenum, row, col, b' ', self._attr)
         fore, back, blink, underline = self._mode.split_attr(self._attr)
         self._queues.video.put(
@@ -181,6 +191,36 @@ class Drawing(object):
         # use attr = 0 ? pagenum parameter? are we actually sending anything to the queue?
         self._text.clear_area(self._apagenum, row0, col0, row1, col1, self._attr)
 
+    ### batched screen updates
+
+    def _add_damage(self, pagenum, x0, y0, x1, y1):
+        """Mark a screen area as changed; it will be sent to the interface with the next batch."""
+        page = self._pixels.pages[pagenum]
+        damage = self._damage.get(pagenum)
+        if damage is None or damage[0] is not page:
+            if damage is not None:
+                # the page buffer has been replaced, send what we have first
+                self._queues.video.flush()
+            self._damage[pagenum] = [page, x0, y0, x1, y1]
+        else:
+            damage[1:] = (
+                min(damage[1], x0), min(damage[2], y0), max(damage[3], x1), max(damage[4], y1)
+            )
+
+    def flush_video(self, video_queue):
+        """Send the changed screen areas to the interface."""
+        if not self._damage:
+            return
+        for pagenum, (page, x0, y0, x1, y1) in iteritems(self._damage):
+            x0, y0 = max(x0, 0), max(y0, 0)
+            x1, y1 = min(x1, page.width-1), min(y1, page.height-1)
+            if x1 >= x0 and y1 >= y0:
+                video_queue.put(signals.Event(
+                    signals.VIDEO_PUT_RECT,
+                    (pagenum, x0, y0, x1, y1, page.get_rect(x0, y0, x1, y1))
+                ))
+        self._damage = {}
+
     ### graphics primitives
 
     def put_pixel(self, x, y, index, pagenum=None):
@@ -189,7 +229,7 @@ class Drawing(object):
             pagenum = self._apagenum
         if self.graph_view.contains(x, y):
             self._pixels.pages[pagenum].put_pixel(x, y, index)
-            self._queues.video.put(signals.Event(signals.VIDEO_PUT_PIXEL, (pagenum, x, y, index)))
+            self._add_damage(pagenum, x, y, x, y)
             self.clear_text_at(x, y)
 
     def get_pixel(self, x, y, pagenum=None):
@@ -205,19 +245,17 @@ class Drawing(object):
     def put_interval(self, pagenum, x, y, colours, mask=0xff):
         """Write a list of attributes to a scanline interval."""
         x, y, colours = self.graph_view.clip_list(x, y, colours)
-        newcolours = self._pixels.pages[pagenum].put_interval(x, y, colours, mask)
-        self._queues.video.put(
-            signals.Event(signals.VIDEO_PUT_INTERVAL, (pagenum, x, y, newcolours))
-        )
+        self._pixels.pages[pagenum].put_interval(x, y, colours, mask)
+        if len(colours):
+            self._add_damage(pagenum, x, y, x+len(colours)-1, y)
         self.clear_text_area(x, y, x+len(colours), y)
 
     def fill_interval(self, x0, x1, y, index):
         """Fill a scanline interval in a solid attribute."""
         x0, x1, y = self.graph_view.clip_interval(x0, x1, y)
         self._pixels.pages[self._apagenum].fill_interval(x0, x1, y, index)
-        self._queues.video.put(
-            signals.Event(signals.VIDEO_FILL_INTERVAL, (self._apagenum, x0, x1, y, index))
-        )
+        if x1 >= x0:
+            self._add_damage(self._apagenum, x0, y, x1, y)
         self.clear_text_area(x0, y, x1, y)
 
     def get_until(self, x0, x1, y, c):
@@ -231,12 +269,9 @@ class Drawing(object):
     def put_rect(self, x0, y0, x1, y1, sprite, operation_token):
         """Apply an [y][x] array of attributes onto a screen rect."""
         x0, y0, x1, y1, sprite = self.graph_view.clip_area(x0, y0, x1, y1, sprite)
-        rect = self._pixels.pages[self._apagenum].put_rect(
-            x0, y0, x1, y1, sprite, operation_token
-        )
-        self._queues.video.put(
-            signals.Event(signals.VIDEO_PUT_RECT, (self._apagenum, x0, y0, x1, y1, rect))
-        )
+        self._pixels.pages[self._apagenum].put_rect(x0, y0, x1, y1, sprite, operation_token)
+        if x1 >= x0 and y1 >= y0:
+            self._add_damage(self._apagenum, x0, y0, x1, y1)
         self.clear_text_area(x0, y0, x1, y1)
 
     def fill_rect(self, x0, y0, x1, y1, index):
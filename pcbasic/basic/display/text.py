@@ -9,6 +9,8 @@ This file is released under the GNU GPL version 3 or later.
 import logging
 import binascii
 
+from ...compat import iterchar
+
 class TextRow(object):
     """Buffer for a single row of the screen."""
 
@@ -60,6 +62,19 @@ class TextRow(object):
             start -= 1
         return min(col, start), max(col, stop)
 
+    def put_chars_attr(self, col, s, attr):
+        """Put a run of bytes to the screen; return the range of columns to redraw."""
+        if self._dbcs_enabled:
+            start, stop = col, col + len(s) - 1
+            for i, c in enumerate(iterchar(s)):
+                start_i, stop_i = self.put_char_attr(col + i, c, attr)
+                start, stop = min(start, start_i), max(stop, stop_i)
+            return start, stop
+        stop = col + len(s) - 1
+        self.buf[col-1:stop] = [(c, attr) for c in iterchar(s)]
+        self.double[col-1:stop] = [0] * len(s)
+        return col, stop
+
 
 class TextPage(object):
     """Buffer for a screen page."""
@@ -132,6 +147,11 @@ class TextBuffer(object):
         assert isinstance(c, bytes), type(c)
         return self.pages[pagenum].row[row-1].put_char_attr(col, c, attr)
 
+    def put_chars_attr(self, pagenum, row, col, s, attr):
+        """Put a run of bytes on a row, reinterpreting SBCS and DBCS as necessary."""
+        assert isinstance(s, bytes), type(s)
+        return self.pages[pagenum].row[row-1].put_chars_attr(col, s, attr)
+
     def scroll_up(self, pagenum, from_line, bottom, attr):
         """Scroll up."""
         self.pages[pagenum].row.insert(
@@ -6,6 +6,7 @@ Text operations
 This file is released under the GNU GPL version 3 or later.
 """
 
+import re
 import logging
 
 from ...compat import iterchar, iteritems, int2byte
@@ -19,6 +20,10 @@ from .text import TextBuffer, TextRow
 from .textbase import BottomBar, Cursor, ScrollArea
 
 
+# control characters interpreted by TextScreen.write, in a group for splitting
+CONTROL_SPLIT = re.compile(b'([\\t\\n\\r\\x07\\x0b\\x0c\\x1c-\\x1f])')
+
+
 class TextScreen(object):
     """Text screen."""
 
@@ -138,7 +143,13 @@ class TextScreen(object):
         last = b''
         # if our line wrapped at the end before, it doesn't anymore
         self.text.pages[self.apagenum].row[self.current_row-1].wrap = False
-        for c in iterchar(s):
+        for i, c in enumerate(CONTROL_SPLIT.split(s)):
+            if not i % 2:
+                # run of non-control chars, including \b and \0
+                if c:
+                    self._write_run(c)
+                    last = c[-1:]
+                continue
             row, col = self.current_row, self.current_col
             if c == b'\t':
                 # TAB
@@ -177,9 +188,6 @@ class TextScreen(object):
             elif c == b'\x1F':
                 # DOWN
                 self.set_pos(row + 1, col, scroll_ok)
-            else:
-                # includes \b, \0, and non-control chars
-                self.write_char(c)
             last = c
 
     def write_line(self, s=b'', scroll_ok=True, do_echo=True):
@@ -228,6 +236,39 @@ class TextScreen(object):
         # move cursor and see if we need to scroll up
         self._check_pos(scroll_ok=True)
 
+    def _write_run(self, s):
+        """Put a run of characters at the current position, as with write_char."""
+        while s:
+            space = self.get_space_on_row()
+            if not space:
+                # wrap, scroll or reposition
+                self.write_char(s[:1])
+                s = s[1:]
+                continue
+            # put as many characters as fit on this row
+            row, col = self.current_row, self.current_col
+            stop = col + min(space, len(s)) - 1
+            self.put_chars_attr(self.apagenum, row, col, s[:stop-col+1], self.attr)
+            s = s[stop-col+1:]
+            therow = self.text.pages[self.apagenum].row[row-1]
+            therow.end = max(therow.end, stop)
+            if stop < self.mode.width:
+                self.current_col = stop + 1
+            else:
+                self.current_col = stop
+                self.overflow = True
+            self._check_pos(scroll_ok=True)
+
+    def get_space_on_row(self):
+        """Number of characters write_char can put on the current row without repositioning."""
+        if self._bottom_row_allowed:
+            settled = self.current_row == self.mode.height
+        else:
+            settled = self.scroll_area.top <= self.current_row <= self.scroll_area.bottom
+        if self.overflow or not settled or not (1 <= self.current_col <= self.mode.width):
+            return 0
+        return self.mode.width - self.current_col + 1
+
     def _check_wrap(self, do_scroll_down):
         """Wrap if we need to."""
         if self.current_col > self.mode.width:
@@ -360,11 +401,20 @@ class TextScreen(object):
         # update the screen
         self.refresh_range(pagenum, row, start, stop)
 
+    def put_chars_attr(self, pagenum, row, col, s, attr):
+        """Put a run of bytes on a row, redrawing as necessary."""
+        if not self.mode.is_text_mode:
+            attr = attr & 0xf
+        start, stop = self.text.put_chars_attr(pagenum, row, col, s, attr)
+        self.refresh_range(pagenum, row, start, stop)
+
     ###########################################################################
 
     def refresh_range(self, pagenum, row, start, stop, text_only=False):
         """Redraw a section of a screen row, assuming DBCS buffer has been set."""
-        therow = self.text.pages[pagenum].row[row-1]
+        if self.mode.is_text_mode or text_only:
+            self._refresh_text_range(pagenum, row, start, stop)
+            return
         col = start
         while col <= stop:
             r, c = row, col
@@ -379,13 +429,47 @@ class TextScreen(object):
                     len(char) > 1, fore, back, blink, underline,
                 )
             ))
-            if not self.mode.is_text_mode and not text_only:
-                # update pixel buffer
-                x0, y0, x1, y1, sprite = self._glyphs.get_sprite(r, c, char, fore, back)
-                self.pixels.pages[self.apagenum].put_rect(x0, y0, x1, y1, sprite, tk.PSET)
+            # update pixel buffer
+            x0, y0, x1, y1, sprite = self._glyphs.get_sprite(r, c, char, fore, back)
+            self.pixels.pages[self.apagenum].put_rect(x0, y0, x1, y1, sprite, tk.PSET)
+            self.queues.video.put(signals.Event(
+                signals.VIDEO_PUT_RECT, (self.apagenum, x0, y0, x1, y1, sprite)
+            ))
+
+    def _refresh_text_range(self, pagenum, row, start, stop):
+        """Redraw glyphs in a section of a screen row, without updating the pixel buffer."""
+        # halfwidth chars with equal attributes are sent to the interface in one run
+        run, run_col, run_attr = [], start, None
+        col = start
+        while col <= stop:
+            char, attr = self.text.get_fullchar_attr(pagenum, row, col)
+            # ensure glyph is stored
+            self._glyphs.check_char(char)
+            if run and (len(char) > 1 or attr != run_attr):
+                self._put_text(pagenum, row, run_col, run, run_attr)
+                run = []
+            if len(char) > 1:
+                fore, back, blink, underline = self.mode.split_attr(attr)
                 self.queues.video.put(signals.Event(
-                    signals.VIDEO_PUT_RECT, (self.apagenum, x0, y0, x1, y1, sprite)
+                    signals.VIDEO_PUT_GLYPH, (
+                        pagenum, row, col, self.codepage.to_unicode(char, u'\0'),
+                        True, fore, back, blink, underline,
+                    )
                 ))
+            else:
+                if not run:
+                    run_col, run_attr = col, attr
+                run.append(self.codepage.to_unicode(char, u'\0'))
+            col += len(char)
+        if run:
+            self._put_text(pagenum, row, run_col, run, run_attr)
+
+    def _put_text(self, pagenum, row, col, chars, attr):
+        """Send a run of halfwidth glyphs to the interface."""
+        fore, back, blink, underline = self.mode.split_attr(attr)
+        self.queues.video.put(signals.Event(
+            signals.VIDEO_PUT_TEXT, (pagenum, row, col, chars, fore, back, blink, underline)
+        ))
 
     def _redraw_row(self, start, row, wrap=True):
         """Draw the screen row, wrapping around and reconstructing DBCS buffer."""
@@ -95,6 +95,41 @@ class NullQueue(object):
         pass
 
 
+class VideoQueue(object):
+    """Video queue wrapper that puts batched drawing signals ahead of any other signal."""
+
+    def __init__(self, video_queue, batchers):
+        """Wrap the queue; batchers have a flush_video(queue) method."""
+        self._queue = video_queue
+        self._batchers = batchers
+        self._last_flush = time.time()
+
+    def flush(self):
+        """Put the held-back signals on the queue."""
+        for batcher in self._batchers:
+            batcher.flush_video(self._queue)
+        self._last_flush = time.time()
+
+    def flush_due(self, interval):
+        """Put the held-back signals on the queue if the last flush is long enough ago."""
+        if time.time() - self._last_flush >= interval:
+            self.flush()
+
+    def put(self, item, block=True, timeout=None):
+        """Put a signal on the queue, after any held-back signals."""
+        self.flush()
+        self._queue.put(item, block, timeout)
+
+    def qsize(self):
+        """Approximate size of the queue."""
+        return self._queue.qsize()
+
+    def join(self):
+        """Wait for the queue to be processed."""
+        self.flush()
+        self._queue.join()
+
+
 class EventQueues(object):
     """Manage interface queues."""
 
@@ -113,12 +148,14 @@ class EventQueues(object):
         self._ctrl_c_is_break = ctrl_c_is_break
         # F12 replacement events
         self._f12_active = False
+        # objects that batch up video signals
+        self._video_batchers = []
         self.set(inputs, video, audio)
 
     def set(self, inputs=None, video=None, audio=None):
         """Set; default is NullQueues."""
         self.inputs = inputs or NullQueue()
-        self.video = video or NullQueue()
+        self.video = VideoQueue(video or NullQueue(), self._video_batchers)
         self.audio = audio or NullQueue()
 
     def __getstate__(self):
@@ -138,6 +175,10 @@ class EventQueues(object):
         """Add an input handler."""
         self._handlers.append(handler)
 
+    def add_video_batcher(self, batcher):
+        """Add an object that holds back video signals; it must have a flush_video(queue) method."""
+        self._video_batchers.append(batcher)
+
     def wait(self):
         """Wait and check events."""
         time.sleep(self.tick)
@@ -149,6 +190,8 @@ class EventQueues(object):
         # and we have put a lot of work on the queue
         # this works because Interface will send KEYB_QUIT on termination
         self._check_input(event_check_input)
+        # send batched drawing at most once per tick
+        self.video.flush_due(self.tick)
         # avoid screen lockups if video queue fills up
         if self.video.qsize() > self.max_video_qsize:
             # note that this really slows down screen writing
@@ -13,6 +13,11 @@ import logging
 from functools import partial
 from contextlib import contextmanager
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from ..compat import queue, text_type
 
 from ..metadata import NAME, VERSION, COPYRIGHT
@@ -51,12 +56,12 @@ class Implementation(object):
     """Interpreter session, implementation class."""
 
     def __init__(
-            self, syntax=u'advanced', double=False, term=u'', shell=u'',
+            self, syntax=u'advanced', double=False, fast_math=False, term=u'', shell=u'',
             output_streams=sys.stdout, input_streams=sys.stdin,
             codepage=None, box_protect=True, font=None, text_width=80,
             video=u'cga', monitor=u'rgb', aspect_ratio=(4, 3), low_intensity=False,
             devices=None, current_device=u'Z:', mount=None,
-            textfile_encoding=None, soft_linefeed=False,
+            textfile_encoding=None, soft_linefeed=False, map_random_files=False,
             keys=u'', check_keybuffer_full=True, ctrl_c_is_break=True,
             hide_listing=None, hide_protected=False,
             peek_values=None, allow_code_poke=False, rebuild_offsets=True,
@@ -86,7 +91,7 @@ class Implementation(object):
         # set up variables and memory model state
         # initialise the data segment
         self.memory = memory.DataSegment(
-            max_memory, reserved_memory, max_reclen, max_files, double
+            max_memory, reserved_memory, max_reclen, max_files, double, fast_math
         )
         # values and variables
         self.strings = self.memory.strings
@@ -150,7 +155,7 @@ class Implementation(object):
         self.files = Files(
             self.values, self.memory, self.queues, self.keyboard, self.display,
             max_files, max_reclen, serial_buffer_size,
-            devices, current_device, mount, textfile_encoding, soft_linefeed
+            devices, current_device, mount, textfile_encoding, soft_linefeed, map_random_files
         )
         # set up the SHELL command
         # Files needed for current disk device
@@ -274,7 +279,11 @@ class Implementation(object):
             value = -1 if value else 0
         if b'(' in name:
             name = name.split(b'(', 1)[0]
-            self.arrays.from_list(value, name)
+            if isinstance(value, (list, tuple)):
+                self.arrays.from_list(value, name)
+            else:
+                # numpy arrays and other buffers
+                self.arrays.from_array(value, name)
         else:
             self.memory.set_variable(name, [], self.values.from_value(value, name[-1:]))
 
@@ -302,6 +311,8 @@ class Implementation(object):
         name = name.upper()
         if b'(' in name:
             name = name.split(b'(', 1)[0]
+            if numpy and as_type is numpy.ndarray:
+                return self.arrays.to_array(name)
             value = self.arrays.to_list(name)
             if not value:
                 return []
@@ -330,6 +341,8 @@ class Implementation(object):
 
     def close(self):
         """Close the session."""
+        # send any drawing still held back to the interface
+        self.queues.video.flush()
         # close files if we opened any
         self.files.close_all()
         self.files.close_devices()
@@ -106,7 +106,10 @@ class Interpreter(object):
                 elif c not in (b':', tk.THEN, tk.ELSE, tk.GOTO):
                     # new statement or branch of an IF statement allowed, nothing else
                     raise error.BASICError(error.STX)
-                self.parser.parse_statement(ins)
+                # cache statement dispatch for stored program code only
+                self.parser.parse_statement(
+                    ins, self._program.statement_cache if self.run_mode else None
+                )
             except error.BASICError as e:
                 self.trap_error(e)
 
@@ -392,6 +395,25 @@ class Interpreter(object):
     def _find_next(self, ins, varname):
         """Helper function for FOR: find matching NEXT."""
         endforpos = ins.tell()
+        if ins is self._program.bytecode:
+            loop_cache = self._program.loop_cache
+            if endforpos not in loop_cache:
+                loop_cache[endforpos] = self._scan_next(ins)
+            nextpos, comma, name = loop_cache[endforpos]
+        else:
+            nextpos, comma, name = self._scan_next(ins)
+        # name completion depends on DEFtype, so can't be stored
+        varname2 = self._memory.complete_name(name) if name else None
+        if (comma or varname2) and varname2 != varname:
+            # NEXT without FOR marked with NEXT line number, while we're only at FOR
+            ins.seek(nextpos)
+            raise error.BASICError(error.NEXT_WITHOUT_FOR)
+        ins.seek(endforpos)
+        return endforpos, nextpos
+
+    def _scan_next(self, ins):
+        """Helper function for FOR: find the position and variable of the matching NEXT."""
+        endforpos = ins.tell()
         ins.skip_block(tk.FOR, tk.NEXT, allow_comma=True)
         if ins.skip_blank() not in (tk.NEXT, b','):
             # FOR without NEXT marked with FOR line number
@@ -401,16 +423,13 @@ class Interpreter(object):
         # check var name for NEXT
         # no-var only allowed in standalone NEXT
         if ins.skip_blank() not in tk.END_STATEMENT:
-            varname2 = self._memory.complete_name(self.parser.parse_name(ins))
+            name = self.parser.parse_name(ins)
         else:
-            varname2 = None
+            name = None
         # get position and line number just after the matching variable in NEXT
         nextpos = ins.tell()
-        if (comma or varname2) and varname2 != varname:
-            # NEXT without FOR marked with NEXT line number, while we're only at FOR
-            raise error.BASICError(error.NEXT_WITHOUT_FOR)
         ins.seek(endforpos)
-        return endforpos, nextpos
+        return nextpos, comma, name
 
     def next_(self, args):
         """Iterate a loop (NEXT)."""
@@ -462,6 +481,16 @@ class Interpreter(object):
         """Helper function for WHILE: find matching WEND."""
         # just after WHILE token
         whilepos = ins.tell()
+        if ins is self._program.bytecode:
+            loop_cache = self._program.loop_cache
+            if whilepos not in loop_cache:
+                loop_cache[whilepos] = self._scan_wend(ins)
+            return whilepos, loop_cache[whilepos]
+        return whilepos, self._scan_wend(ins)
+
+    def _scan_wend(self, ins):
+        """Helper function for WHILE: find the position after the matching WEND."""
+        whilepos = ins.tell()
         ins.skip_block(tk.WHILE, tk.WEND)
         if ins.read(1) != tk.WEND:
             # WHILE without WEND
@@ -470,7 +499,7 @@ class Interpreter(object):
         ins.skip_to(tk.END_STATEMENT)
         wendpos = ins.tell()
         ins.seek(whilepos)
-        return whilepos, wendpos
+        return wendpos
 
     def _check_while_condition(self, ins, whilepos):
         """Check condition of while-loop."""
@@ -525,7 +554,9 @@ class Interpreter(object):
             self._program_code.seek(self.data_pos)
             if self._program_code.peek() in tk.END_STATEMENT:
                 # initialise - find first DATA
-                self._program_code.skip_to_token(tk.DATA,)
+                data_start = self._program.find_data(self.data_pos)
+                if data_start is not None:
+                    self._program_code.seek(data_start)
             if self._program_code.read(1) not in (tk.DATA, b','):
                 self._program_code.seek(current)
                 raise error.BASICError(error.OUT_OF_DATA)
@@ -7,8 +7,14 @@ This file is released under the GNU GPL version 3 or later.
 """
 
 import binascii
+import bisect
 import struct
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from ...compat import iteritems, iterkeys
 
 from ..base import error
@@ -47,6 +53,9 @@ class Arrays(object):
         self._buffers = {}
         self._cache = {}
         self._array_memory = {}
+        # element size and index strides, by name
+        self._descriptors = {}
+        self._rebuild_map()
         self.current = 0
 
     def erase_(self, args):
@@ -65,13 +74,22 @@ class Arrays(object):
             del self._buffers[name]
             del self._cache[name]
             del self._array_memory[name]
+            del self._descriptors[name]
             # update memory model
             for name in self._array_memory:
                 name_ptr, array_ptr = self._array_memory[name]
                 if name_ptr > erased_name_ptr:
                     self._array_memory[name] = name_ptr - freed_bytes, array_ptr - freed_bytes
+            self._rebuild_map()
             self.current -= freed_bytes
 
+    def _rebuild_map(self):
+        """Build the address-sorted map of array records."""
+        records = sorted((_ptrs, _name) for _name, _ptrs in iteritems(self._array_memory))
+        self._map_names = [_name for _, _name in records]
+        self._map_name_ptrs = [_ptrs[0] for _ptrs, _ in records]
+        self._map_array_ptrs = [_ptrs[1] for _ptrs, _ in records]
+
     def index(self, index, dimensions):
         """Return the flat index for a given dimensioned index."""
         bigindex = 0
@@ -82,6 +100,14 @@ class Arrays(object):
             area *= dimensions[i] + 1 - self._base
         return bigindex
 
+    def _offset(self, name, index):
+        """Return the byte offset and size of an element of an allocated array."""
+        size, strides = self._descriptors[name]
+        bigindex = 0
+        for stride, i in zip(strides, index):
+            bigindex += stride * (i - self._base)
+        return bigindex * size, size
+
     def array_len(self, dimensions):
         """Return the flat length for given dimensioned size."""
         return self.index(dimensions, dimensions) + 1
@@ -159,6 +185,13 @@ class Arrays(object):
         self._buffers[name] = bytearray(array_bytes)
         self._dims[name] = dimensions
         self._cache[name] = None
+        # precompute the index strides; OPTION BASE can't change while arrays exist
+        strides, area = [], 1
+        for d in dimensions:
+            strides.append(area)
+            area *= d + 1 - self._base
+        self._descriptors[name] = values.size_bytes(name), strides
+        self._rebuild_map()
 
     def check_dim(self, name, index):
         """
@@ -198,10 +231,9 @@ class Arrays(object):
 
     def view_buffer(self, name, index):
         """Return a memoryview to an array element."""
-        dimensions, lst = self.check_dim(name, index)
-        bigindex = self.index(index, dimensions)
-        bytesize = values.size_bytes(name)
-        return memoryview(lst)[bigindex*bytesize:(bigindex+1)*bytesize]
+        _, lst = self.check_dim(name, index)
+        offset, size = self._offset(name, index)
+        return memoryview(lst)[offset:offset+size]
 
     def get(self, name, index):
         """Retrieve a view of the value of an array element."""
@@ -220,41 +252,33 @@ class Arrays(object):
 
     def varptr(self, name, indices):
         """Retrieve the address of an array."""
-        dimensions = self._dims[name]
         _, array_ptr = self._array_memory[name]
         # arrays are kept at the end of the var list
-        return (
-            self._memory.var_current() + array_ptr +
-            values.size_bytes(name) * self.index(indices, dimensions)
-        )
+        return self._memory.var_current() + array_ptr + self._offset(name, indices)[0]
 
     def dereference(self, address):
         """Get a value for an array given its pointer address."""
-        found_addr = -1
-        found_name = None
-        for name, data in iteritems(self._array_memory):
-            addr = self._memory.var_current() + data[1]
-            if addr > found_addr and addr <= address:
-                found_addr = addr
-                found_name = name
-        if not found_name:
+        # last array starting at or before the address
+        index = bisect.bisect_right(
+            self._map_array_ptrs, address - self._memory.var_current()
+        ) - 1
+        if index < 0:
             return None
+        name = self._map_names[index]
         lst = self._buffers[name]
-        offset = address - found_addr
+        offset = address - self._memory.var_current() - self._map_array_ptrs[index]
         return self._values.from_bytes(lst[offset : offset+values.size_bytes(name)])
 
     def get_memory(self, address):
         """Retrieve data from data memory: array space """
-        name_addr = -1
-        arr_addr = -1
-        the_arr = None
-        for name in self._array_memory:
-            name_try, arr_try = self._array_memory[name]
-            if name_try <= address and name_try > name_addr:
-                name_addr, arr_addr = name_try, arr_try
-                the_arr = name
-        if the_arr is None:
+        # last array record starting at or before the address
+        index = bisect.bisect_right(
+            self._map_name_ptrs, address - self._memory.var_current()
+        ) - 1
+        if index < 0:
             return -1
+        the_arr = self._map_names[index]
+        name_addr, arr_addr = self._array_memory[the_arr]
         var_current = self._memory.var_current()
         if address >= var_current + arr_addr:
             offset = address - arr_addr - var_current
@@ -279,13 +303,8 @@ class Arrays(object):
                 return data_rep[offset]
 
     def get_strings(self):
-        """Return a list of views of string array elements."""
-        return [
-            memoryview(buf)[i:i+3]
-            for name, buf in iteritems(self._buffers)
-            if name[-1:] == values.STR
-            for i in range(0, len(buf), 3)
-        ]
+        """Return a list of the buffers of string arrays."""
+        return [buf for name, buf in iteritems(self._buffers) if name[-1:] == values.STR]
 
 
     ###########################################################################
@@ -328,3 +347,70 @@ class Arrays(object):
                 self._to_list(name, index+[i+(self._base or 0)], remaining_dimensions[1:])
                 for i in range(remaining_dimensions[0])
             ]
+
+    def from_array(self, array, name):
+        """Convert numpy array or other buffer to BASIC array, allocating it if needed."""
+        if not numpy:
+            raise ValueError('Module `numpy` is needed for conversion from buffers.')
+        array = numpy.asarray(array)
+        if name[-1:] == values.STR:
+            # strings are not stored in the array buffer
+            return self.from_list(array.tolist(), name)
+        if name[-1:] == values.INT:
+            array = self._to_integers(array)
+        base = self._base or 0
+        if name not in self._dims:
+            self.allocate(name, [_n - 1 + base for _n in array.shape])
+        extent = tuple(_d + 1 - base for _d in self._dims[name])
+        if array.shape != extent:
+            if len(array.shape) != len(extent) or any(
+                    _n > _e for _n, _e in zip(array.shape, extent)
+                ):
+                raise error.BASICError(error.SUBSCRIPT_OUT_OF_RANGE)
+            # fill in the given part of the existing array
+            full = self.to_array(name)
+            full[tuple(slice(0, _n) for _n in array.shape)] = array
+            array = full
+        # first index runs fastest in BASIC memory, i.e. Fortran order
+        flat = array.ravel(order='F')
+        if name[-1:] == values.INT:
+            self._buffers[name][:] = flat.tobytes()
+        else:
+            try:
+                self._buffers[name][:] = values.mbf.from_floats(flat, values.size_bytes(name))
+            except OverflowError:
+                raise error.BASICError(error.OVERFLOW)
+        self._cache[name] = None
+
+    @staticmethod
+    def _to_integers(array):
+        """Round a numpy array half away from zero and convert to 16-bit integers."""
+        if array.dtype.kind not in 'iub':
+            array = numpy.asarray(array, dtype=float)
+            if not numpy.all(numpy.isfinite(array)):
+                raise error.BASICError(error.OVERFLOW)
+            array = numpy.sign(array) * numpy.floor(numpy.abs(array) + .5)
+        if array.size and (array.min() < -0x8000 or array.max() > 0x7fff):
+            raise error.BASICError(error.OVERFLOW)
+        return array.astype('<i2')
+
+    def to_array(self, name):
+        """Convert BASIC array to numpy array."""
+        if not numpy:
+            raise ValueError('Module `numpy` is needed for conversion to arrays.')
+        if name not in self._dims:
+            return numpy.array([])
+        base = self._base or 0
+        extent = tuple(_d + 1 - base for _d in self._dims[name])
+        buf = self._buffers[name]
+        if name[-1:] == values.INT:
+            flat = numpy.frombuffer(buf, dtype='<i2').copy()
+        elif name[-1:] == values.STR:
+            size = values.size_bytes(name)
+            flat = numpy.array([
+                self._values.from_bytes(buf[_i:_i+size]).to_value()
+                for _i in range(0, len(buf), size)
+            ], dtype=object)
+        else:
+            flat = values.mbf.to_floats(buf, values.size_bytes(name))
+        return flat.reshape(extent, order='F')
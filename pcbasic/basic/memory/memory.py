@@ -90,7 +90,9 @@ class DataSegment(object):
     # protection flag
     protection_flag_addr = 1450
 
-    def __init__(self, total_memory, reserved_memory, max_reclen, max_files, double):
+    def __init__(
+            self, total_memory, reserved_memory, max_reclen, max_files, double, fast_math=False
+        ):
         """Initialise memory."""
         # BASIC stack (determined by CLEAR)
         # Initially, the stack space should be set to 512 bytes,
@@ -114,7 +116,7 @@ class DataSegment(object):
         # string space
         self.strings = values.StringSpace(self)
         # prepare string and number handler
-        self.values = values.Values(self.strings, double)
+        self.values = values.Values(self.strings, double, fast_math)
         # scalar space
         self.scalars = scalars.Scalars(self, self.values)
         # array space
@@ -278,8 +280,8 @@ class DataSegment(object):
             return
         # find all strings that are actually referenced
         stack_strings = [value.view() for stack in self._stack for value in stack if isinstance(value, values.String)]
-        string_ptrs = self.scalars.get_strings() + self.arrays.get_strings() + stack_strings
-        self.strings.collect_garbage(string_ptrs)
+        string_buffers = self.scalars.get_strings() + self.arrays.get_strings() + stack_strings
+        self.strings.collect_garbage(string_buffers)
 
     def check_free(self, size, err):
         """Check if sufficient free memory is avilable, raise error if not."""
@@ -237,6 +237,25 @@ class ExpressionParser(object):
 
     def parse(self, ins):
         """Parse and evaluate tokenised (sub-)expression."""
+        program = self._memory.program
+        if ins is not program.bytecode:
+            return self._parse(ins)
+        # stored program code: evaluate from compiled form if we can
+        start = ins.tell()
+        try:
+            compiled = program.expression_cache[start]
+        except KeyError:
+            compiled = program.expression_cache[start] = self._compile(ins)
+            ins.seek(start)
+        if compiled is None:
+            return self._parse(ins)
+        steps, end = compiled
+        value = self._evaluate(steps)
+        ins.seek(end)
+        return value
+
+    def _parse(self, ins):
+        """Parse and evaluate tokenised (sub-)expression from the byte stream."""
         operations = deque()
         with self._memory.get_stack() as units:
             final = True
@@ -329,6 +348,179 @@ class ExpressionParser(object):
             args = reversed([units.pop() for _ in range(narity)])
             units.append(oper(*args))
 
+    ###########################################################################
+    # compiled expressions
+
+    def _compile(self, ins):
+        """Compile stored (sub-)expression; return evaluation steps and end position, or None."""
+        try:
+            steps = self._compile_steps(ins)
+        except (error.BASICError, _NotCompiled):
+            # leave errors and unsupported syntax to the byte-stream parser
+            return None
+        return steps, ins.tell()
+
+    def _compile_steps(self, ins):
+        """Compile tokenised (sub-)expression to a list of evaluation steps."""
+        # this follows the shunting-yard in _parse() but does not evaluate anything
+        steps, operations = [], []
+        # number of units on the evaluation stack
+        depth = 0
+        d = b''
+        while True:
+            last = d
+            ins.skip_blank()
+            d = ins.read_keyword_token()
+            ins.seek(-len(d), 1)
+            if d == tk.NOT and not (last in op.OPERATORS or last == b''):
+                break
+            elif d in op.OPERATORS:
+                ins.read(len(d))
+                prec = op.PRECEDENCE[d]
+                if d in op.COMBINABLE:
+                    nxt = ins.skip_blank()
+                    if nxt in op.COMBINABLE:
+                        d += ins.read(len(nxt))
+                if last in op.OPERATORS or last == b'' or d == tk.NOT:
+                    nargs, oper = 1, op.UNARY.get(d)
+                else:
+                    nargs, oper = 2, op.BINARY.get(d)
+                    depth = self._drain_steps(prec, operations, steps, depth)
+                if oper is None:
+                    raise _NotCompiled()
+                operations.append((oper, nargs, prec))
+            elif not (last in op.OPERATORS or last == b''):
+                break
+            elif d == b'(':
+                ins.read(len(d))
+                # a bracketed sub-expression is evaluated in line
+                steps.extend(self._compile_steps(ins))
+                ins.require_read((b')',))
+                depth += 1
+            elif d and d in LETTERS:
+                name = ins.read_name()
+                if not name:
+                    raise _NotCompiled()
+                steps.extend(self._compile_indices(ins, name))
+                depth += 1
+            elif d in self._functions:
+                steps.append(self._compile_function(ins, d))
+                depth += 1
+            elif d in tk.END_EXPRESSION:
+                break
+            elif d == b'"':
+                steps.append(partial(_push_copy, self.read_string_literal(ins)))
+                depth += 1
+            elif d in DIGITS:
+                # ASCII literal: keep conversion (and any overflow message) at run time
+                steps.append(partial(self._push_repr, ins.read_number()))
+                depth += 1
+            else:
+                steps.append(partial(_push_copy, self.read_number_literal(ins)))
+                depth += 1
+        depth = self._drain_steps(0, operations, steps, depth)
+        if not depth:
+            raise _NotCompiled()
+        return steps
+
+    def _drain_steps(self, precedence, operations, steps, depth):
+        """Emit operator steps until an operator of low precedence on top; return stack depth."""
+        while operations:
+            if precedence > operations[-1][2]:
+                break
+            oper, narity, _ = operations.pop()
+            if depth < narity:
+                raise _NotCompiled()
+            steps.append(partial(_apply_operator, oper, narity))
+            depth -= narity - 1
+        return depth
+
+    def _compile_indices(self, ins, name):
+        """Compile array indices, if any, and variable retrieval."""
+        steps, count = [], 0
+        if ins.skip_blank_read_if((b'[', b'(')):
+            while True:
+                steps.extend(self._compile_steps(ins))
+                steps.append(_convert_index)
+                count += 1
+                if not ins.skip_blank_read_if((b',',)):
+                    break
+            ins.require_read((b']', b')'))
+        steps.append(partial(self._push_variable, name, count))
+        return steps
+
+    def _compile_function(self, ins, token):
+        """Compile a function call with fixed argument syntax."""
+        ins.read(len(token))
+        if token in self._simple:
+            parse_args = self._simple[token]
+        else:
+            fndict = self._complex[token]
+            presign = ins.skip_blank_read_if(fndict)
+            if presign:
+                token += presign
+            parse_args = fndict.get(presign)
+        # user functions, INSTR, VARPTR etc. have syntax that depends on run-time state
+        syntax = getattr(parse_args, 'func', parse_args)
+        length = getattr(parse_args, 'keywords', {}).get('length', 1)
+        args = []
+        if token == tk.FN or syntax is None:
+            raise _NotCompiled()
+        elif syntax == self._no_argument:
+            pass
+        elif syntax == self._gen_parse_arguments:
+            ins.require_read((b'(',))
+            for _ in range(length-1):
+                args.append(self._compile_steps(ins))
+                ins.require_read((b',',))
+            args.append(self._compile_steps(ins))
+            ins.require_read((b')',))
+        elif syntax == self._gen_parse_arguments_optional:
+            ins.require_read((b'(',))
+            args.append(self._compile_steps(ins))
+            for _ in range(length-2):
+                ins.require_read((b',',))
+                args.append(self._compile_steps(ins))
+            if ins.skip_blank_read_if((b',',)):
+                args.append(self._compile_steps(ins))
+            else:
+                args.append(None)
+            ins.require_read((b')',))
+        elif syntax == self._gen_parse_one_optional_argument:
+            if ins.skip_blank_read_if((b'(',)):
+                args.append(self._compile_steps(ins))
+                ins.require_read((b')',))
+            else:
+                args.append(None)
+        else:
+            raise _NotCompiled()
+        return partial(self._push_function, token, args)
+
+    def _evaluate(self, steps):
+        """Evaluate a compiled (sub-)expression."""
+        with self._memory.get_stack() as units:
+            for step in steps:
+                step(units)
+            return units[0]
+
+    def _push_variable(self, name, count, units):
+        """Evaluation step: retrieve a variable with the given number of indices."""
+        indices = [units.pop() for _ in range(count)]
+        indices.reverse()
+        units.append(self._memory.view_or_create_variable(name, indices))
+
+    def _push_function(self, token, args, units):
+        """Evaluation step: call a function; arguments are evaluated as it requests them."""
+        units.append(self._callbacks[token](
+            None if _arg is None else self._evaluate(_arg) for _arg in args
+        ))
+
+    def _push_repr(self, word, units):
+        """Evaluation step: convert an ASCII numeric literal."""
+        units.append(self._values.from_repr(word, allow_nonnum=False))
+
+    ###########################################################################
+
     def read_string_literal(self, ins):
         """Read a quoted string literal (no leading blanks), return as String."""
         # address points to initial quote
@@ -504,3 +696,21 @@ class ExpressionParser(object):
             yield ins.read_name()
             yield self.parse_indices(ins)
         ins.require_read((b')',))
+
+
+class _NotCompiled(Exception):
+    """Expression syntax that can't be compiled."""
+
+
+def _push_copy(value, units):
+    """Evaluation step: push a copy of a literal."""
+    units.append(value.clone())
+
+def _convert_index(units):
+    """Evaluation step: convert an array index to int."""
+    units.append(values.to_int(units.pop()))
+
+def _apply_operator(oper, narity, units):
+    """Evaluation step: apply an operator to the top of the stack."""
+    args = reversed([units.pop() for _ in range(narity)])
+    units.append(oper(*args))
@@ -40,6 +40,7 @@ class Parser(object):
         # can't be pickled
         pickle_dict['_simple'] = None
         pickle_dict['_complex'] = None
+        pickle_dict['_parsers'] = None
         pickle_dict['_callbacks'] = None
         return pickle_dict
 
@@ -53,34 +54,44 @@ class Parser(object):
         self.init_statements(session)
         self.expression_parser.init_functions(session)
 
-    def parse_statement(self, ins):
-        """Parse and execute a single statement."""
-        # read keyword token or one byte
+    def parse_statement(self, ins, cache=None):
+        """Parse and execute a single statement; use cache to store or retrieve its dispatch."""
         ins.skip_blank()
+        if cache is None:
+            c = self._read_statement_token(ins)
+        else:
+            pos = ins.tell()
+            try:
+                c, argpos = cache[pos]
+                ins.seek(argpos)
+            except KeyError:
+                c = self._read_statement_token(ins)
+                cache[pos] = c, ins.tell()
+        if c is None:
+            ins.require_end()
+            return
+        self._callbacks[c](self._parsers[c](ins))
+        # end-of-statement is checked at start of next statement in interpreter loop
+
+    def _read_statement_token(self, ins):
+        """Read the statement keyword; return the callback key or None if not a statement."""
+        # read keyword token or one byte
         c = ins.read_keyword_token()
         if c in self._simple:
-            parse_args = self._simple[c]
+            return c
         elif c in self._complex:
             stat_dict = self._complex[c]
             ins.skip_blank()
             selector = ins.read_keyword_token()
             ins.seek(-len(selector), 1)
-            if selector not in stat_dict.keys():
-                selector = None
-            else:
+            if selector in stat_dict:
                 c += selector
-            parse_args = stat_dict[selector]
-        else:
-            ins.seek(-len(c), 1)
-            if c in set(iterchar(LETTERS)):
-                # implicit LET
-                c = tk.LET
-                parse_args = self._simple[tk.LET]
-            else:
-                ins.require_end()
-                return
-        self._callbacks[c](parse_args(ins))
-        # end-of-statement is checked at start of next statement in interpreter loop
+            return c
+        ins.seek(-len(c), 1)
+        if c in self._letters:
+            # implicit LET
+            return tk.LET
+        return None
 
     def parse_name(self, ins):
         """Get scalar part of variable name from token stream."""
@@ -261,6 +272,12 @@ class Parser(object):
                 None: self._parse_com_command,
             },
         }
+        # argument parsers keyed by callback key, including selector for complex statements
+        self._parsers = dict(self._simple)
+        for token, stat_dict in self._complex.items():
+            for selector, parse_args in stat_dict.items():
+                self._parsers[token + (selector or b'')] = parse_args
+        self._letters = set(iterchar(LETTERS))
 
     def init_statements(self, session):
         """Initialise statement callbacks."""
@@ -7,6 +7,7 @@ This file is released under the GNU GPL version 3 or later.
 """
 
 import binascii
+import bisect
 import logging
 import struct
 import io
@@ -39,6 +40,16 @@ class Program(object):
         self.tokeniser = tokeniser
         self.lister = lister
 
+    def __getstate__(self):
+        """Pickle."""
+        pickle_dict = self.__dict__.copy()
+        # caches may hold functions, which can't be pickled; they'll be rebuilt
+        for name in (
+                'statement_cache', 'expression_cache',
+            ):
+            pickle_dict[name] = {}
+        return pickle_dict
+
     def __repr__(self):
         """Return a marked-up hex dump of the program (for debugging)."""
         code = self.bytecode.getvalue()
@@ -76,8 +87,31 @@ class Program(object):
         self.bytecode.write(b'\0\0\0')
         self.protected = False
         self.line_numbers = {65536: 0}
+        self._rebuild_index()
         self.last_stored = None
         self.code_size = self.bytecode.tell()
+        self._reset_caches()
+
+    def _reset_caches(self):
+        """Drop all information decoded from the bytecode; call after any change to the code."""
+        # statement dispatch, keyed by position of statement start
+        self.statement_cache = {}
+        # compiled expressions, keyed by position of expression start
+        self.expression_cache = {}
+        # matching NEXT and WEND, keyed by position just after FOR or WHILE
+        self.loop_cache = {}
+        # positions of DATA statements, in order; built on first READ
+        self._data_index = None
+
+    def _rebuild_index(self):
+        """Build the sorted line number index from the line number dictionary."""
+        # line numbers in ascending order and their positions, in the same order
+        self._index_lines = sorted(self.line_numbers)
+        self._index_pos = [self.line_numbers[_linum] for _linum in self._index_lines]
+        # positions can only be bisected if the lines are stored in ascending order
+        self._index_ordered = all(
+            _pos < _next for _pos, _next in zip(self._index_pos, self._index_pos[1:])
+        )
 
     def truncate(self, rest=b''):
         """Write bytecode and cut the program of beyond the current position."""
@@ -92,6 +126,12 @@ class Program(object):
 
     def get_line_number(self, pos):
         """Get line number for stream position."""
+        if pos is None:
+            return -1
+        if self._index_ordered:
+            # last line starting at or before the given position
+            index = bisect.bisect_right(self._index_pos, pos) - 1
+            return self._index_lines[index] if index >= 0 else -1
         pre = -1
         for linum in self.line_numbers:
             linum_pos = self.line_numbers[linum]
@@ -99,8 +139,29 @@ class Program(object):
                 pre = linum
         return pre
 
+    def find_data(self, pos):
+        """Get position of the first DATA statement after a statement separator, or None."""
+        if self._data_index is None:
+            current = self.bytecode.tell()
+            self._data_index = []
+            self.bytecode.seek(0)
+            while self.bytecode.skip_to_token(tk.DATA):
+                self._data_index.append(self.bytecode.tell())
+                self.bytecode.read(len(tk.DATA))
+                # skip the items as READ does; they are not tokenised and may contain REM bytes
+                while True:
+                    self.bytecode.read_to((b'"',) + tk.END_STATEMENT)
+                    if not self.bytecode.read_string():
+                        break
+            self.bytecode.seek(current)
+        index = bisect.bisect_right(self._data_index, pos)
+        if index < len(self._data_index):
+            return self._data_index[index]
+        return None
+
     def rebuild_line_dict(self):
         """Preparse to build line number dictionary."""
+        self._reset_caches()
         self.line_numbers, offsets = {}, []
         self.bytecode.seek(0)
         scanline, scanpos, last = 0, 0, 0
@@ -119,6 +180,7 @@ class Program(object):
             scanpos = self.bytecode.tell()
             offsets.append(scanpos)
         self.line_numbers[65536] = scanpos
+        self._rebuild_index()
         # rebuild offsets
         if self._rebuild_offsets:
             self.bytecode.seek(0)
@@ -145,13 +207,19 @@ class Program(object):
             next_addr, = struct.unpack('<H', next_addr)
             self.bytecode.seek(-2, 1)
             self.bytecode.write(struct.pack('<H', next_addr + length))
-            self.bytecode.read(next_addr - addr - 2)
+            self.bytecode.seek(next_addr - addr - 2, 1)
             addr = next_addr
         # update line number dict
         for key in deleteable:
             del self.line_numbers[key]
         for key in beyond:
             self.line_numbers[key] += length
+        # update line number index; the lines beyond are at the end
+        end = len(self._index_lines) - len(beyond)
+        start = end - len(deleteable)
+        del self._index_lines[start:end]
+        del self._index_pos[start:end]
+        self._index_pos[start:] = [_pos + length for _pos in self._index_pos[start:]]
 
     def check_number_start(self, linebuf):
         """Check if the given line buffer starts with a line number."""
@@ -198,23 +266,26 @@ class Program(object):
             )
         # write back the remainder of the program
         self.truncate(rest)
+        self._reset_caches()
         # update all next offsets by shifting them by the length of the added line
         self.update_line_dict(pos, afterpos, length, deleteable, beyond)
         if not empty:
             self.line_numbers[scanline] = pos
+            index = bisect.bisect_left(self._index_lines, scanline)
+            self._index_lines.insert(index, scanline)
+            self._index_pos.insert(index, pos)
         self.last_stored = scanline
 
     def find_pos_line_dict(self, fromline, toline):
         """Find code positions for line range."""
-        deleteable = [ num for num in self.line_numbers if num >= fromline and num <= toline ]
-        beyond = [num for num in self.line_numbers if num > toline ]
-        # find lowest number strictly above range
-        afterpos = self.line_numbers[min(beyond)]
-        # find lowest number within range
-        try:
-            startpos = self.line_numbers[min(deleteable)]
-        except ValueError:
-            startpos = afterpos
+        start = bisect.bisect_left(self._index_lines, fromline)
+        end = bisect.bisect_right(self._index_lines, toline)
+        deleteable = self._index_lines[start:end]
+        beyond = self._index_lines[end:]
+        # position of lowest number strictly above range
+        afterpos = self._index_pos[end]
+        # position of lowest number within range
+        startpos = self._index_pos[start] if deleteable else afterpos
         return startpos, afterpos, deleteable, beyond
 
     def delete(self, fromline, toline):
@@ -231,6 +302,7 @@ class Program(object):
         rest = self.bytecode.read()
         self.bytecode.seek(startpos)
         self.truncate(rest)
+        self._reset_caches()
         # update line number dict
         self.update_line_dict(startpos, afterpos, 0, deleteable, beyond)
 
@@ -283,6 +355,8 @@ class Program(object):
             old_to_new[old_line] = new_line
             self.last_stored = new_line
             new_line += step
+        # line number pointers are about to change
+        self._reset_caches()
         # write the new numbers
         for old_line in old_to_new:
             self.bytecode.seek(self.line_numbers[old_line])
@@ -321,6 +395,9 @@ class Program(object):
             new_lines[old_to_new[old_line]] = self.line_numbers[old_line]
             del self.line_numbers[old_line]
         self.line_numbers.update(new_lines)
+        # renumbering keeps the order, so the positions in the index stay as they are
+        start = bisect.bisect_left(self._index_lines, start_line)
+        self._index_lines[start:start+len(old_to_new)] = sorted(old_to_new.values())
         return old_to_new
 
     def load(self, g):
@@ -342,7 +419,7 @@ class Program(object):
             # or it'll end up after the new code in memory
             self.bytecode.truncate()
             # anything but numbers or whitespace: Direct Statement in File
-            self.merge(g)
+            self._load_ascii(g)
         else:
             logging.debug('Incorrect file type `%s` on LOAD', g.filetype)
         # rebuild line number dict and offsets
@@ -352,6 +429,11 @@ class Program(object):
 
     def merge(self, g):
         """Merge program from ascii or utf8 (if utf8_files is True) stream."""
+        for linebuf in self._tokenise_lines(g):
+            self.store_line(linebuf)
+
+    def _tokenise_lines(self, g):
+        """Tokenise the numbered lines of an ascii stream."""
         while True:
             line, cr = g.read_line()
             if not line and not cr:
@@ -363,12 +445,62 @@ class Program(object):
             linebuf = self.tokeniser.tokenise_line(line)
             if linebuf.read(1) == b'\0':
                 # line starts with a number, add to program memory; store_line seeks to 1 first
-                self.store_line(linebuf)
+                yield linebuf
             else:
                 # we have read the :
                 if linebuf.skip_blank() not in tk.END_LINE:
                     raise error.BASICError(error.DIRECT_STATEMENT_IN_FILE)
 
+    def _load_ascii(self, g):
+        """Load an ascii stream into an empty program, storing all lines at once."""
+        # tokenised lines after the \x00\xC0\xDE header, by line number
+        lines = {}
+        tokenise_error = None
+        try:
+            for linebuf in self._tokenise_lines(g):
+                linebuf.seek(1)
+                scanline = self.lister.detokenise_line_number(linebuf)
+                if linebuf.skip_blank_read() in tk.END_LINE:
+                    # a line number on its own deletes the line, as in store_line
+                    if scanline not in lines:
+                        raise error.BASICError(error.UNDEFINED_LINE_NUMBER)
+                    del lines[scanline]
+                else:
+                    lines[scanline] = linebuf.getvalue()[3:]
+                self.last_stored = scanline
+        except error.BASICError as e:
+            tokenise_error = e
+        # store whatever was read before an error, like the line-by-line merge would
+        try:
+            self._store_lines(lines)
+        except error.BASICError:
+            # the error that stopped reading the file comes first
+            if tokenise_error is None:
+                raise
+        if tokenise_error is not None:
+            raise tokenise_error
+
+    def _store_lines(self, lines):
+        """Write a dictionary of tokenised lines as the whole program, in one pass."""
+        self.bytecode.seek(0)
+        self.line_numbers = {}
+        try:
+            for scanline in sorted(lines):
+                pos = self.bytecode.tell()
+                length = len(lines[scanline]) + 3
+                # check for free memory
+                if self.code_start + 1 + pos + length > self._memory.stack_start():
+                    raise error.BASICError(error.OUT_OF_MEMORY)
+                self.bytecode.write(
+                    struct.pack('<BH', 0, self.code_start + 1 + pos + length) + lines[scanline]
+                )
+                self.line_numbers[scanline] = pos
+        finally:
+            self.line_numbers[65536] = self.bytecode.tell()
+            self.truncate()
+            self._rebuild_index()
+            self._reset_caches()
+
     def save(self, g):
         """Save the program to stream g in (A)scii, (B)ytecode or (P)rotected mode."""
         mode = g.filetype
@@ -420,18 +552,22 @@ class Program(object):
 
     def get_memory(self, offset):
         """Retrieve data from program code."""
-        offset -= self.code_start
-        code = self.bytecode.getvalue()
-        try:
-            return ord(code[offset:offset+1])
-        except IndexError:
-            return -1
+        code = self._read_code(offset - self.code_start, 1)
+        return ord(code) if code else -1
 
     def get_memory_block(self, offset, length):
         """Retrieve block of data from program code."""
-        offset -= self.code_start
-        code = self.bytecode.getvalue()
-        return bytearray(code[offset:offset+length])
+        return bytearray(self._read_code(offset - self.code_start, length))
+
+    def _read_code(self, offset, length):
+        """Read from the bytecode in place, without copying the whole program."""
+        if offset < 0:
+            return b''
+        current = self.bytecode.tell()
+        self.bytecode.seek(offset)
+        code = self.bytecode.read(length)
+        self.bytecode.seek(current)
+        return code
 
     def set_memory(self, offset, val):
         """Change program code."""
@@ -10,6 +10,7 @@ from . import numbers
 from . import strings
 from . import values
 from . import randomiser
+from . import mbf
 
 from .numbers import *
 from .strings import *
@@ -0,0 +1,84 @@
+"""
+PC-BASIC - mbf.py
+Bulk conversion between Microsoft Binary Format and IEEE floating point
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+# These functions convert whole buffers of packed single- or double-precision values at once
+# and produce the same bits as Single and Double .from_value() and .to_value() in numbers.py.
+# See there for a description of the format.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# format parameters by size in bytes:
+# numpy integer type, exponent bias, exponent shift, mantissa mask, positive mask
+_FORMATS = {
+    4: ('<u4', 128 + 24, 128 + 24 - 129, 0xffffff, 0x7fffff),
+    8: ('<u8', 128 + 56, 128 + 56 - 129, 0xffffffffffffff, 0x7fffffffffffff),
+}
+
+
+def _get_format(size):
+    """Check availability and retrieve format parameters."""
+    if not numpy:
+        raise ValueError('Module `numpy` is needed for bulk float conversion.')
+    try:
+        return _FORMATS[size]
+    except KeyError:
+        raise ValueError('Float size must be 4 or 8 bytes, not %d.' % (size,))
+
+
+def to_floats(mbf_bytes, size):
+    """Convert a buffer of packed MBF singles (size 4) or doubles (size 8) to a numpy float array."""
+    dtype, bias, _, mask, posmask = _get_format(size)
+    raw = numpy.frombuffer(bytes(mbf_bytes), dtype=dtype)
+    exp = (raw >> (size*8 - 8)).astype(int)
+    # prepend assumed bit; the sign bit is in its place
+    man = ((raw & posmask) | (posmask + 1)).astype(float)
+    floats = numpy.ldexp(man, exp - bias)
+    floats[(raw & (posmask + 1)) != 0] *= -1.
+    floats[exp == 0] = 0.
+    return floats
+
+
+def from_floats(floats, size):
+    """Convert an array of numbers to packed MBF singles (size 4) or doubles (size 8)."""
+    dtype, bias, shift, mask, posmask = _get_format(size)
+    floats = numpy.asarray(floats, dtype=float).ravel()
+    if not numpy.all(numpy.isfinite(floats)):
+        raise OverflowError('Cannot convert infinite or NaN value.')
+    nonzero = floats != 0.
+    neg = floats < 0.
+    mag = numpy.where(nonzero, numpy.abs(floats), 1.)
+    # initial exponent guess and truncated mantissa, as in Float.from_value
+    exp = numpy.trunc(numpy.log(mag) / numpy.log(2.) - shift).astype(int)
+    man = numpy.trunc(numpy.ldexp(mag, -exp)).astype(dtype)
+    exp += bias
+    # bring mantissa to range (posmask, mask]
+    while True:
+        low = man <= posmask
+        if not low.any():
+            break
+        man[low] <<= 1
+        exp[low] -= 1
+    while True:
+        high = man > mask
+        if not high.any():
+            break
+        man[high] >>= 1
+        exp[high] += 1
+    if (exp[nonzero] > 255).any():
+        raise OverflowError('Value out of range for MBF float.')
+    # underflow results in zero
+    nonzero &= exp > 0
+    # clear the assumed bit for positive numbers, it becomes the sign bit
+    man &= numpy.where(neg, mask, posmask).astype(dtype)
+    raw = man | (exp.astype(dtype) << (size*8 - 8))
+    raw[~nonzero] = 0
+    return raw.astype(dtype).tobytes()
@@ -501,6 +501,9 @@ class Float(Number):
         """Set value to Python int."""
         if in_int == 0:
             self._buffer[:] = b'\0' * self.size
+        elif self._values.fast_math and -0x1000000 < in_int < 0x1000000:
+            # exactly representable in either precision
+            return self._from_native(float(in_int))
         else:
             neg = in_int < 0
             man, exp = self._bring_to_range(abs(in_int), self._bias, self._posmask, self._mask)
@@ -590,10 +593,14 @@ class Float(Number):
 
     def iadd(self, right):
         """Add in-place."""
+        if self._values.fast_math:
+            return self._from_native(self.to_value() + right.to_value())
         return self._normalise(*self._add_den(self._denormalise(), right._denormalise()))
 
     def isub(self, right):
         """Subtract in-place."""
+        if self._values.fast_math:
+            return self._from_native(self.to_value() - right.to_value())
         rexp, rman, rneg = right._denormalise()
         return self._normalise(*self._add_den(self._denormalise(), (rexp, rman, not rneg)))
 
@@ -603,6 +610,8 @@ class Float(Number):
             # set any zeroes to standard zero
             self._buffer[:] = b'\0' * self.size
             return self
+        if self._values.fast_math:
+            return self._from_native(self.to_value() * right_in.to_value())
         lexp, lman, lneg = self._denormalise()
         rexp, rman, rneg = right_in._denormalise()
         lexp += rexp - right_in._bias - 8
@@ -627,6 +636,8 @@ class Float(Number):
             raise ZeroDivisionError(self)
         if self.is_zero():
             return self
+        if self._values.fast_math:
+            return self._from_native(self.to_value() / right_in.to_value())
         lexp, lman, lneg = self._div_den(self._denormalise(), right_in._denormalise())
         # normalise and return
         return self._normalise(lexp, lman, lneg)
@@ -886,6 +897,7 @@ class Float(Number):
     _den_mask = None
     _den_upper = None
     _carrymask = None
+    _native_scale = None
 
     def _denormalise(self):
         """Denormalise to shifted mantissa, exp, sign."""
@@ -920,6 +932,31 @@ class Float(Number):
             self._buffer[-1:] = int2byte(exp)
         return self
 
+    def _from_native(self, in_float):
+        """Set to Python float rounded to nearest, halves to even; for fast math."""
+        if in_float == 0.:
+            self._buffer[:] = b'\0' * self.size
+            return self
+        man, exp = math.frexp(in_float)
+        neg = man < 0.
+        # mantissa is in [0.5, 1), as is the MBF mantissa with its assumed bit
+        # round explicitly, as round() does not halve to even on Python 2
+        scaled = abs(man) * self._native_scale
+        man = int(math.floor(scaled))
+        frac = scaled - man
+        man += (frac > .5) or (frac == .5 and man & 1)
+        if man > self._mask:
+            exp += 1
+            man >>= 1
+        exp += 128
+        if not self._check_limits(exp, neg):
+            return self
+        struct.pack_into(
+            self._intformat, self._buffer, 0, man & (self._mask if neg else self._posmask)
+        )
+        self._buffer[-1:] = int2byte(exp)
+        return self
+
     def _to_int_den(self):
         """Denormalised float to integer."""
         exp, man, neg = self._denormalise()
@@ -1079,6 +1116,7 @@ class Single(Float):
     _signmask = 0x800000
     _mask = 0xffffff
     _posmask = 0x7fffff
+    _native_scale = 2.**24
 
     _one = b'\x00\x00\x00\x81'
     _ten = b'\x00\x00\x20\x84'
@@ -1136,6 +1174,7 @@ class Double(Float):
     _signmask = 0x80000000000000
     _mask = 0xffffffffffffff
     _posmask = 0x7fffffffffffff
+    _native_scale = 2.**56
 
     _one = b'\x00\x00\x00\x00\x00\x00\x00\x81'
     _ten = b'\x00\x00\x00\x00\x00\x00\x20\x84'
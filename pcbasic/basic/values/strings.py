@@ -10,8 +10,6 @@ import struct
 import logging
 from operator import itemgetter
 
-from ...compat import iteritems
-
 from ..base import error
 from . import numbers
 
@@ -158,24 +156,33 @@ class StringSpace(object):
     def __init__(self, memory):
         """Initialise empty string space."""
         self._memory = memory
-        self._strings = {}
         self._temp = None
         self.clear()
 
     def __repr__(self):
         """Debugging representation of string table."""
-        return '\n'.join('%x: %r' % (n, v) for n, v in iteritems(self._strings))
+        return '\n'.join(
+            '%x: %r' % (_addr, self._heap[_addr:_addr+self._lengths[_addr]])
+            for _addr in self._addresses
+        )
 
     def clear(self):
         """Empty string space."""
-        self._strings.clear()
         # strings are placed at the top of string memory, just below the stack
         self.current = self._memory.stack_start()
+        # string memory, indexed by address; never resized, but strings move in garbage collection
+        # so a view of a string is only valid until the next collection
+        self._heap = bytearray(self.current + 1)
+        # lengths of stored strings by address
+        self._lengths = {}
+        # addresses of stored strings, in descending order, which is the order of storage
+        self._addresses = []
 
     def rebuild(self, stringspace):
         """Rebuild from stored copy."""
-        self.clear()
-        self._strings.update(stringspace._strings)
+        self._heap = bytearray(stringspace._heap)
+        self._lengths = dict(stringspace._lengths)
+        self._addresses = list(stringspace._addresses)
         self.current = stringspace.current
 
     def copy_to(self, string_space, length, address):
@@ -184,16 +191,16 @@ class StringSpace(object):
 
     def iterpointers(self):
         """Iterate over strings in order of addresses."""
-        # we need to enforce the order as it's undefined otherwise
-        return ((len(self._strings[_addr]), _addr )for _addr in sorted(self._strings))
+        return ((self._lengths[_addr], _addr) for _addr in reversed(self._addresses))
 
     def _retrieve(self, length, address):
-        """Retrieve a string by its pointer."""
+        """Retrieve a view on a string by its pointer."""
         # if string length == 0, return empty string
-        try:
-            return bytearray() if length == 0 else self._strings[address]
-        except KeyError:
+        if length == 0:
+            return memoryview(bytearray())
+        if address not in self._lengths:
             raise KeyError(u'Dereferencing detached string at %x (%d)' % (address, address))
+        return memoryview(self._heap)[address:address+self._lengths[address]]
 
     def view(self, length, address):
         """Return a writeable view of a string from its string pointer."""
@@ -202,7 +209,7 @@ class StringSpace(object):
             return memoryview(bytearray())
         if address >= self._memory.var_start():
             # string stored in string space
-            return memoryview(self._retrieve(length, address))
+            return self._retrieve(length, address)
         elif address >= self._memory.code_start:
             # get string stored in code as bytearray
             codestr = self._memory.program.get_memory_block(address, length)
@@ -235,64 +242,92 @@ class StringSpace(object):
             address = self.current + 1
             # don't store empty strings
             if length > 0:
-                # copy and convert to bytearray
-                self._strings[address] = bytearray(in_str)
+                self._heap[address:address+length] = in_str
+                self._lengths[address] = length
+                self._addresses.append(address)
         return length, address
 
     def _delete_last(self):
         """Delete the string provided if it is at the top of string space."""
         last_address = self.current + 1
-        try:
-            length = len(self._strings[last_address])
-            self.current += length
-            del self._strings[last_address]
-        except KeyError:
-            # happens if we're called before an out-of-memory exception is handled
-            # and the string wasn't allocated
-            pass
-
-    def collect_garbage(self, string_ptrs):
-        """Re-store the strings referenced in string_ptrs, delete the rest."""
-        # string_ptrs should be a list of memoryviews to the original pointers
-        # retrieve addresses and copy strings
+        # the string may not have been allocated
+        # if we're called before an out-of-memory exception is handled
+        if self._addresses and self._addresses[-1] == last_address:
+            self.current += self._lengths.pop(self._addresses.pop())
+
+    def collect_garbage(self, string_buffers):
+        """Re-store the strings referenced in string_buffers, delete the rest."""
+        # string_buffers should be a list of writeable buffers holding consecutive string pointers
+        # retrieve addresses of all referenced strings
         string_list = []
+        var_start = self._memory.var_start()
         # find last non-temporary string
         last_permanent = self._memory.stack_start()
-        last_perm_view = None
-        for view in string_ptrs:
-            length, addr = struct.unpack('<BH', view.tobytes())
-            # exclude empty elements of string arrays (len==0 and addr==0)
-            # exclude strings is not located in memory (FIELD or code strings)
-            if addr >= self._memory.var_start():
-                string_list.append((view, addr, self._retrieve(length, addr)))
+        sentinel = None
+        for buf in string_buffers:
+            count = len(buf) // 3
+            pointers = struct.unpack_from('<' + 'BH' * count, buf)
+            for i in range(count):
+                length, addr = pointers[2*i], pointers[2*i+1]
+                # exclude empty elements of string arrays (len==0 and addr==0)
+                # exclude strings is not located in memory (FIELD or code strings)
+                if addr < var_start:
+                    continue
+                if length:
+                    # use the stored length; raise KeyError if detached
+                    length = len(self._retrieve(length, addr))
+                entry = addr, length, buf, 3*i
+                string_list.append(entry)
                 # set sentinel string (lowest-address permanent string)
                 # don't use zero-length strings as sentinel:
                 # they share an address with allocated strings and may get swapped on sorting
                 # in which case the allocated permanent string ends up below the sentinel
                 if self._temp is not None and length > 0:
                     if addr > self._temp and addr < last_permanent:
-                        last_permanent, last_perm_view = addr, view
+                        last_permanent, sentinel = addr, entry
         # sort by address, largest first (maintain order of storage)
-        string_list.sort(key=itemgetter(1), reverse=True)
-        # clear the string buffer and re-store all referenced strings
-        self.clear()
-        for view, _, string in string_list:
-            # re-allocate string space
-            # update the original pointers supplied (these are memoryviews)
-            view[:] = struct.pack('<BH', *self.store(string, check_free=False))
+        string_list.sort(key=itemgetter(0), reverse=True)
+        # assign new addresses from the top down, as if all strings were stored again
+        # strings that survived the last collection and are all still in use keep their address
+        # so that usually only the strings allocated since then are moved
+        old_heap, self.current = self._heap, self._memory.stack_start()
+        if len(old_heap) != self.current + 1:
+            self._heap = bytearray(self.current + 1)
+        moves, lengths, addresses = [], [], []
+        for entry in string_list:
+            addr, length, buf, offset = entry
+            self.current -= length
+            new_addr = self.current + 1
+            if length:
+                lengths.append(length)
+                addresses.append(new_addr)
+                if new_addr != addr or self._heap is not old_heap:
+                    moves.append((addr, new_addr, length))
+            if struct.unpack_from('<BH', buf, offset) != (length, new_addr):
+                # update the original pointers supplied
+                buf[offset:offset+3] = struct.pack('<BH', length, new_addr)
+            if entry is sentinel:
+                last_permanent = new_addr
+        if moves:
+            # copy the source region first, as strings may be moved over each other
+            low = min(_move[0] for _move in moves)
+            high = max(_move[0] + _move[2] for _move in moves)
+            source = old_heap[low:high]
+            for addr, new_addr, length in moves:
+                self._heap[new_addr:new_addr+length] = source[addr-low:addr-low+length]
+        self._lengths = dict(zip(addresses, lengths))
+        self._addresses = addresses
         # readdress  start of temporary strings
-        if last_perm_view is None:
+        if sentinel is None:
             self._temp = None
         elif self._temp is not None and self._temp != self._memory.stack_start():
-            self._temp = -1 + struct.unpack_from('<H', last_perm_view.tobytes(), 1)[0]
+            self._temp = last_permanent - 1
 
     def get_memory(self, address):
         """Retrieve data from data memory: string space """
-        # find the variable we're in
-        for try_address, value in iteritems(self._strings):
-            length = len(value)
-            if try_address <= address < try_address + length:
-                return value[address - try_address]
+        # strings are stored without gaps from the current pointer up
+        if self.current < address < len(self._heap):
+            return self._heap[address]
         return -1
 
     def fix_temporaries(self):
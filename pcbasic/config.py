@@ -65,6 +65,9 @@ STATE_PATH = os.path.join(USER_DATA_HOME, BASENAME)
 # @: target drive for bundled programs
 PROGRAM_PATH = os.path.join(STATE_PATH, u'bundled_programs')
 
+# compiled font glyph stores
+FONT_CACHE_PATH = os.path.join(STATE_PATH, u'fonts')
+
 # format for log files
 LOGGING_FORMAT = u'[%(asctime)s.%(msecs)04d] %(levelname)s: %(message)s'
 LOGGING_FORMATTER = logging.Formatter(fmt=LOGGING_FORMAT, datefmt=u'%H:%M:%S')
@@ -265,7 +268,7 @@ class Settings(object):
         u'interface': {
             u'type': u'string', u'default': u'',
             u'choices': (u'', u'none', u'cli', u'text', u'graphical',
-                        u'ansi', u'curses', u'pygame', u'sdl2'), },
+                        u'ansi', u'curses', u'pygame', u'sdl2', u'headless'), },
         u'sound': {
             u'type': u'string', u'default': u'',
             u'choices': (u'', u'none', u'beep', u'portaudio', u'interface'), },
@@ -277,8 +280,10 @@ class Settings(object):
         u'exec': {u'type': u'string', u'default': u'', },
         u'quit': {u'type': u'bool', u'default': False,},
         u'double': {u'type': u'bool', u'default': False,},
+        u'fast-math': {u'type': u'bool', u'default': False,},
         u'max-files': {u'type': u'int', u'default': 3,},
         u'max-reclen': {u'type': u'int', u'default': 128,},
+        u'map-random-files': {u'type': u'bool', u'default': False,},
         u'serial-buffer-size': {u'type': u'int', u'default': 256,},
         u'peek': {u'type': u'string', u'list': u'*', u'default': [],},
         u'lpt1': {u'type': u'string', u'default': u'PRINTER:',},
@@ -329,6 +334,7 @@ class Settings(object):
         u'allow-code-poke': {u'type': u'bool', u'default': False,},
         u'reserved-memory': {u'type': u'int', u'default': 3429,},
         u'caption': {u'type': u'string', u'default': NAME,},
+        u'frame-dump': {u'type': u'string', u'default': u'',},
         u'text-width': {u'type': u'int', u'choices':(u'40', u'80'), u'default': 80,},
         u'video-memory': {u'type': u'int', u'default': 262144,},
         u'shell': {u'type': u'string', u'default': u'',},
@@ -563,7 +569,9 @@ class Settings(object):
             'text_width': self.get('text-width'),
             'video_memory': self.get('video-memory'),
             'low_intensity': cga_low,
-            'font': data.read_fonts(codepage_dict, self.get('font'), warn=self.get('debug')),
+            'font': data.read_fonts(
+                codepage_dict, self.get('font'), warn=self.get('debug'), cache_dir=FONT_CACHE_PATH
+            ),
             # inserted keystrokes
             # we first need to encode the unicode to bytes before we can decode it
             # this preserves unicode as \x (if latin-1) and \u escapes
@@ -572,6 +580,7 @@ class Settings(object):
             'term': self.get('term'),
             'shell': self.get('shell'),
             'double': self.get('double'),
+            'fast_math': self.get('fast-math'),
             # device settings
             'devices': device_params,
             'current_device': current_device,
@@ -580,6 +589,7 @@ class Settings(object):
             # text file parameters
             'textfile_encoding': self.get('text-encoding'),
             'soft_linefeed': self.get('soft-linefeed'),
+            'map_random_files': self.get('map-random-files'),
             # keyboard settings
             'ctrl_c_is_break': self.get('ctrl-c-break'),
             # program parameters
@@ -626,6 +636,7 @@ class Settings(object):
             'mouse_clipboard': self.get('mouse-clipboard'),
             'icon': ICON,
             'wait': self.get('wait'),
+            'frame_dump': self.get('frame-dump'),
             }
 
     def _get_audio_parameters(self):
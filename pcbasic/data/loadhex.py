@@ -6,7 +6,12 @@ HEX font loader
 This file is released under the GNU GPL version 3 or later.
 """
 
+import os
+import re
 import sys
+import mmap
+import struct
+import hashlib
 import pkg_resources
 import logging
 import binascii
@@ -25,9 +30,16 @@ FONTS = sorted(
     if name.lower().endswith(u'.hex'))
 )
 
+# binary glyph store, cached on disk
+STORE_PATTERN = u'{name}_{height:02d}.{digest}.glyphs'
+STORE_REGEXP = u'^{name}_{height:02d}\\.[0-9a-f]{{16}}\\.glyphs$'
+STORE_MAGIC = b'PC-BASIC glyphs\x1a'
+STORE_HEADER = struct.Struct('<16sLLL')
+STORE_CODEPOINT = struct.Struct('<L')
 
-def read_fonts(codepage_dict, font_families, warn=False):
-    """Load font typefaces."""
+
+def read_fonts(codepage_dict, font_families, warn=False, cache_dir=None):
+    """Load font typefaces; keep compiled glyph stores in cache_dir if given."""
     # load the graphics fonts, including the 8-pixel RAM font
     # use set() for speed - lookup is O(1) rather than O(n) for list
     unicode_needed = set(itervalues(codepage_dict))
@@ -48,17 +60,25 @@ def read_fonts(codepage_dict, font_families, warn=False):
     for height in (16, 14, 8):
         # load a Unifont .hex font and take the codepage subset
         font_files = []
-        for name in font_families:
-            try:
-                font_files.append(
-                    get_data(FONT_PATTERN, path=FONT_DIR, name=name, height=height)
-                )
-            except ResourceFailed as e:
-                if warn:
-                    logging.debug(e)
-        fonts[height] = FontLoader(height).load_hex(
-            font_files, unicode_needed, substitutes, warn=warn
-        )
+        try:
+            for name in font_families:
+                try:
+                    hexres = get_data(FONT_PATTERN, path=FONT_DIR, name=name, height=height)
+                except ResourceFailed as e:
+                    if warn:
+                        logging.debug(e)
+                    continue
+                font_files.append(_get_glyphs(
+                    hexres, name, height, unicode_needed | set(substitutes), cache_dir
+                ))
+            fonts[height] = FontLoader(height).load_glyphs(
+                font_files, unicode_needed, substitutes, warn=warn
+            )
+        finally:
+            # glyphs have been copied out of the stores, release the mapped files
+            for glyphs in font_files:
+                if isinstance(glyphs, GlyphStore):
+                    glyphs.close()
         # fix missing code points font based on 16-line font
         if fonts[16]:
             fonts[height].fix_missing(unicode_needed, fonts[16])
@@ -75,6 +95,164 @@ def read_fonts(codepage_dict, font_families, warn=False):
     return {height: font for height, font in iteritems(fonts)}
 
 
+def _get_glyphs(hexres, name, height, needed, cache_dir):
+    """Get the glyph store for a .hex font, compiling it to the cache if needed."""
+    if cache_dir:
+        try:
+            return GlyphStore.from_cache(hexres, name, height, cache_dir)
+        except (EnvironmentError, ValueError, struct.error) as e:
+            logging.debug('Could not use cached glyph store for %s_%02d: %s', name, height, e)
+    # no cache available, only take the glyphs we need
+    return dict(_parse_hex(hexres, height, needed))
+
+
+def _parse_hex(hexres, height, needed=None):
+    """Iterate over grapheme clusters and glyphs in a .hex font; first definition only."""
+    seen = set()
+    for line in hexres.splitlines():
+        # ignore empty lines and comment lines (first char is #)
+        if (not line) or (line[:1] == b'#'):
+            continue
+        # strip off comments
+        # split unicodepoint and hex string (max 32 chars)
+        ucs_str, fonthex = line.split(b'#')[0].split(b':')
+        ucs_sequence = ucs_str.split(b',')
+        fonthex = fonthex.strip()
+        # extract codepoint and hex string;
+        # discard anything following whitespace; ignore malformed lines
+        try:
+            # construct grapheme cluster
+            c = u''.join(unichr(int(ucshex.strip(), 16)) for ucshex in ucs_sequence)
+            # skip grapheme clusters we won't need
+            if needed is not None and c not in needed:
+                continue
+            # skip chars we already have
+            if c in seen:
+                continue
+            # string must be 32-byte or 16-byte; cut to required font size
+            if len(fonthex) < 32:
+                raise ValueError
+            if len(fonthex) < 64:
+                fonthex = fonthex[:2*height]
+            else:
+                fonthex = fonthex[:4*height]
+            glyph = binascii.unhexlify(fonthex)
+        except Exception as e:
+            logging.warning('Could not parse line in font file: %s', repr(line))
+        else:
+            seen.add(c)
+            yield c, glyph
+
+
+class GlyphStore(object):
+    """Compiled glyphs of a .hex font, in a memory-mapped file."""
+
+    # layout:
+    #   header: magic, height, number of single code points, number of clusters
+    #   sorted table of single code points, 4 bytes each
+    #   glyph records: width in bytes per row, glyph padded to double width
+    #   grapheme clusters: length of utf-8 key, key, glyph record
+
+    def __init__(self, store_file):
+        """Map the store file."""
+        self._map = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._height, self._count, n_clusters = STORE_HEADER.unpack_from(self._map)
+        if magic != STORE_MAGIC:
+            self._map.close()
+            raise ValueError('%s is not a glyph store' % store_file.name)
+        self._record_size = 1 + 2 * self._height
+        self._records = STORE_HEADER.size + self._count * STORE_CODEPOINT.size
+        # read the grapheme clusters, there won't be many
+        self._clusters = {}
+        pos = self._records + self._count * self._record_size
+        for _ in range(n_clusters):
+            length = ord(self._map[pos:pos+1])
+            cluster = self._map[pos+1:pos+1+length].decode('utf-8')
+            self._clusters[cluster] = self._read_record(pos + 1 + length)
+            pos += 1 + length + self._record_size
+
+    @classmethod
+    def from_cache(cls, hexres, name, height, cache_dir):
+        """Open the cached store for a .hex font, compiling it first if not there."""
+        digest = hashlib.sha1(hexres).hexdigest()[:16]
+        store_name = STORE_PATTERN.format(name=name, height=height, digest=digest)
+        path = os.path.join(cache_dir, store_name)
+        if not os.path.isfile(path):
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            cls._compile(hexres, height, path)
+            # remove finished stores of older versions of the font
+            # leave temporary files alone, another process may be compiling
+            stale = re.compile(STORE_REGEXP.format(name=re.escape(name), height=height))
+            for old_name in os.listdir(cache_dir):
+                if stale.match(old_name) and old_name != store_name:
+                    try:
+                        os.remove(os.path.join(cache_dir, old_name))
+                    except EnvironmentError:
+                        pass
+        with open(path, 'rb') as store_file:
+            return cls(store_file)
+
+    @staticmethod
+    def _compile(hexres, height, path):
+        """Write a .hex font as a binary store."""
+        singles, clusters = {}, {}
+        for cluster, glyph in _parse_hex(hexres, height):
+            # store as width byte followed by glyph padded to double width
+            record = (
+                bytearray((len(glyph) // height,))
+                + glyph + b'\0' * (2 * height - len(glyph))
+            )
+            if len(cluster) == 1:
+                singles[ord(cluster)] = record
+            else:
+                clusters[cluster.encode('utf-8')] = record
+        codepoints = sorted(singles)
+        # write to temporary file first, so that an incomplete store never gets used
+        temp_path = u'{0}.{1}.tmp'.format(path, os.getpid())
+        with open(temp_path, 'wb') as store_file:
+            store_file.write(STORE_HEADER.pack(STORE_MAGIC, height, len(codepoints), len(clusters)))
+            store_file.write(b''.join(STORE_CODEPOINT.pack(_cp) for _cp in codepoints))
+            store_file.write(b''.join(bytes(singles[_cp]) for _cp in codepoints))
+            for key, record in iteritems(clusters):
+                store_file.write(bytes(bytearray((len(key),))) + key + bytes(record))
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+
+    def close(self):
+        """Unmap the store file."""
+        self._map.close()
+
+    def _read_record(self, pos):
+        """Read a glyph record at a given offset."""
+        width = ord(self._map[pos:pos+1])
+        return self._map[pos+1:pos+1+width*self._height]
+
+    def _find(self, codepoint):
+        """Binary search for a code point in the table; return index or -1."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value, = STORE_CODEPOINT.unpack_from(self._map, STORE_HEADER.size + 4*mid)
+            if value < codepoint:
+                lo = mid + 1
+            elif value > codepoint:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def get(self, cluster, default=None):
+        """Get the glyph for a grapheme cluster."""
+        if len(cluster) != 1:
+            return self._clusters.get(cluster, default)
+        index = self._find(ord(cluster))
+        if index < 0:
+            return default
+        return self._read_record(self._records + index * self._record_size)
+
+
 class FontLoader(object):
     """Single-height bitfont."""
 
@@ -83,43 +261,17 @@ class FontLoader(object):
         self._height = height
         self._fontdict = {}
 
-    def load_hex(self, hex_resources, unicode_needed, substitutes, warn=True):
-        """Load a set of overlaying unifont .hex files."""
+    def load_glyphs(self, glyph_sources, unicode_needed, substitutes, warn=True):
+        """Load glyphs from a set of overlaying fonts; later ones take precedence."""
         self._fontdict = {}
         all_needed = unicode_needed | set(substitutes)
-        for hexres in reversed(hex_resources):
-            if hexres is None:
-                continue
-            for line in hexres.splitlines():
-                # ignore empty lines and comment lines (first char is #)
-                if (not line) or (line[:1] == b'#'):
-                    continue
-                # strip off comments
-                # split unicodepoint and hex string (max 32 chars)
-                ucs_str, fonthex = line.split(b'#')[0].split(b':')
-                ucs_sequence = ucs_str.split(b',')
-                fonthex = fonthex.strip()
-                # extract codepoint and hex string;
-                # discard anything following whitespace; ignore malformed lines
-                try:
-                    # construct grapheme cluster
-                    c = u''.join(unichr(int(ucshex.strip(), 16)) for ucshex in ucs_sequence)
-                    # skip grapheme clusters we won't need
-                    if c not in all_needed:
-                        continue
-                    # skip chars we already have
-                    if (c in self._fontdict):
-                        continue
-                    # string must be 32-byte or 16-byte; cut to required font size
-                    if len(fonthex) < 32:
-                        raise ValueError
-                    if len(fonthex) < 64:
-                        fonthex = fonthex[:2*self._height]
-                    else:
-                        fonthex = fonthex[:4*self._height]
-                    self._fontdict[c] = binascii.unhexlify(fonthex)
-                except Exception as e:
-                    logging.warning('Could not parse line in font file: %s', repr(line))
+        for glyphs in reversed(glyph_sources):
+            for c in all_needed:
+                # skip chars we already have
+                if c not in self._fontdict:
+                    glyph = glyphs.get(c)
+                    if glyph is not None:
+                        self._fontdict[c] = glyph
         # substitute code points
         self._fontdict.update({
             old: self._fontdict[new]
@@ -16,6 +16,7 @@ from .video_cli import VideoCLI
 from .video_curses import VideoCurses
 from .video_pygame import VideoPygame
 from .video_sdl2 import VideoSDL2
+from .video_headless import VideoHeadless
 
 # audio plugins
 from .audio import AudioPlugin
@@ -24,6 +24,7 @@ class VideoPlugin(object):
         self._handlers = {
             signals.VIDEO_SET_MODE: self.set_mode,
             signals.VIDEO_PUT_GLYPH: self.put_glyph,
+            signals.VIDEO_PUT_TEXT: self.put_text,
             signals.VIDEO_CLEAR_ROWS: self.clear_rows,
             signals.VIDEO_SCROLL_UP: self.scroll_up,
             signals.VIDEO_SCROLL_DOWN: self.scroll_down,
@@ -142,6 +143,11 @@ class VideoPlugin(object):
     def put_glyph(self, pagenum, row, col, char, is_fullwidth, fore, back, blink, underline):
         """Put a character at a given position."""
 
+    def put_text(self, pagenum, row, col, chars, fore, back, blink, underline):
+        """Put a run of halfwidth characters starting at a given position."""
+        for i, char in enumerate(chars):
+            self.put_glyph(pagenum, row, col+i, char, False, fore, back, blink, underline)
+
     def build_glyphs(self, new_dict):
         """Build a dict of glyphs for use in text mode."""
 
@@ -0,0 +1,280 @@
+"""
+PC-BASIC - video_headless.py
+Headless framebuffer interface
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+import os
+import io
+import zlib
+import struct
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from ..compat import iteritems
+from .video import VideoPlugin
+from .base import video_plugins, InitFailed
+
+
+# PNG file signature
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+@video_plugins.register('headless')
+class VideoHeadless(VideoPlugin):
+    """Framebuffer interface without a display, for automated runs and profiling."""
+
+    def __init__(self, input_queue, video_queue, frame_dump=u'', **kwargs):
+        """Initialise headless interface."""
+        VideoPlugin.__init__(self, input_queue, video_queue)
+        if not numpy:
+            raise InitFailed('Module `numpy` not found')
+        # frame file name; if it contains a % placeholder, dump every changed frame
+        self._frame_dump = frame_dump
+        self._dump_all = u'%' in frame_dump
+        self._frame_count = 0
+        # screen pages, in [y][x] attribute format
+        self.pixels = []
+        self.size = 0, 0
+        self.font_width, self.font_height = 8, 16
+        self.text_mode = True
+        self.vpagenum, self.apagenum = 0, 0
+        # prebuilt glyphs, in [y][x] format
+        self.glyph_dict = {}
+        # palette lookup tables for blink states 0, 1
+        self.num_fore_attrs = 16
+        self._palette = [numpy.zeros((256, 3), dtype=numpy.uint8)] * 2
+        self._saved_palette = [None, None]
+        self._composite = False
+        # cursor
+        self.cursor_visible = True
+        self.cursor_row, self.cursor_col = 1, 1
+        self.cursor_attr = 7
+        self.cursor_width = 8
+        self.cursor_from, self.cursor_to = 0, 0
+
+    def __exit__(self, type, value, traceback):
+        """Close the interface; write the final frame if requested."""
+        if self._dump_all:
+            # changes received along with the quit signal have not been written yet
+            self._work()
+        elif self._frame_dump and self.pixels:
+            self.save_frame(self._frame_dump)
+        VideoPlugin.__exit__(self, type, value, traceback)
+
+    def _work(self):
+        """Display update cycle."""
+        if self.busy:
+            if self._dump_all and self.pixels:
+                self.save_frame(self._frame_dump % (self._frame_count,))
+            self._frame_count += 1
+            self.busy = False
+
+    ###########################################################################
+    # frame output
+
+    def render(self):
+        """Render the visible page to a numpy [y][x][rgb] array."""
+        canvas = self.pixels[self.vpagenum]
+        if (
+                self.text_mode and self.cursor_visible and self.vpagenum == self.apagenum
+                and self.cursor_from <= self.cursor_to
+            ):
+            canvas = canvas.copy()
+            x0, y0 = (self.cursor_col-1) * self.font_width, (self.cursor_row-1) * self.font_height
+            canvas[
+                y0 + self.cursor_from : y0 + self.cursor_to + 1,
+                x0 : x0 + self.cursor_width
+            ] = self.cursor_attr
+        return self._palette[0][canvas]
+
+    def save_frame(self, filename):
+        """Write the visible page to a PNG or raw RGB file, depending on the file extension."""
+        rgb = self.render()
+        height, width = rgb.shape[:2]
+        try:
+            with io.open(filename, 'wb') as frame_file:
+                if os.path.splitext(filename)[1].lower() == '.png':
+                    write_png(frame_file, width, height, rgb.tobytes())
+                else:
+                    frame_file.write(rgb.tobytes())
+        except EnvironmentError as e:
+            logging.warning('Could not write frame to %s: %s', filename, e)
+
+    ###########################################################################
+    # signal handlers
+
+    def set_mode(self, mode_info):
+        """Initialise a given text or graphics mode."""
+        self.text_mode = mode_info.is_text_mode
+        self.font_height = mode_info.font_height
+        self.font_width = mode_info.font_width
+        self.glyph_dict = {u'\0': numpy.zeros((self.font_height, self.font_width), dtype=bool)}
+        self.size = (mode_info.pixel_width, mode_info.pixel_height)
+        self.set_cursor_shape(self.font_width, self.font_height, 0, self.font_height)
+        width, height = self.size
+        self.pixels = [
+            numpy.zeros((height, width), dtype=numpy.uint8)
+            for _ in range(mode_info.num_pages)
+        ]
+        self.vpagenum, self.apagenum = 0, 0
+        self.busy = True
+
+    def set_palette(self, rgb_palette_0, rgb_palette_1):
+        """Build the palette."""
+        self.num_fore_attrs = min(16, len(rgb_palette_0))
+        num_back_attrs = min(8, self.num_fore_attrs)
+        rgb_palette_1 = rgb_palette_1 or rgb_palette_0
+        # bottom 128 are non-blink, top 128 blink to background
+        show_palette_0 = rgb_palette_0[:self.num_fore_attrs] * (256//self.num_fore_attrs)
+        show_palette_1 = rgb_palette_1[:self.num_fore_attrs] * (128//self.num_fore_attrs)
+        for b in (
+                rgb_palette_1[:num_back_attrs] *
+                (128 // self.num_fore_attrs // num_back_attrs)
+            ):
+            show_palette_1 += [b]*self.num_fore_attrs
+        self._palette = [
+            numpy.array(show_palette_0, dtype=numpy.uint8),
+            numpy.array(show_palette_1, dtype=numpy.uint8)
+        ]
+        self.busy = True
+
+    def set_composite(self, on, composite_colors):
+        """Enable/disable composite artifacts."""
+        if on != self._composite:
+            self._palette, self._saved_palette = self._saved_palette, self._palette
+        if on:
+            self._palette = [numpy.array(composite_colors, dtype=numpy.uint8)] * 2
+        self._composite = on
+        self.busy = True
+
+    def clear_rows(self, back_attr, start, stop):
+        """Clear a range of screen rows."""
+        self.pixels[self.apagenum][
+            (start-1)*self.font_height : stop*self.font_height, :
+        ] = back_attr
+        self.busy = True
+
+    def set_page(self, vpage, apage):
+        """Set the visible and active page."""
+        self.vpagenum, self.apagenum = vpage, apage
+        self.busy = True
+
+    def copy_page(self, src, dst):
+        """Copy source to destination page."""
+        self.pixels[dst][:] = self.pixels[src]
+        self.busy = True
+
+    def show_cursor(self, cursor_on):
+        """Change visibility of cursor."""
+        self.cursor_visible = cursor_on
+        self.busy = True
+
+    def move_cursor(self, crow, ccol):
+        """Move the cursor to a new position."""
+        self.cursor_row, self.cursor_col = crow, ccol
+
+    def set_cursor_attr(self, attr):
+        """Change attribute of cursor."""
+        self.cursor_attr = attr % self.num_fore_attrs
+
+    def scroll_up(self, from_line, scroll_height, back_attr):
+        """Scroll the screen up between from_line and scroll_height."""
+        pixels = self.pixels[self.apagenum]
+        new_y0, new_y1 = (from_line-1)*self.font_height, (scroll_height-1)*self.font_height
+        old_y0, old_y1 = from_line*self.font_height, scroll_height*self.font_height
+        pixels[new_y0:new_y1] = pixels[old_y0:old_y1]
+        pixels[new_y1:old_y1] = back_attr
+        self.busy = True
+
+    def scroll_down(self, from_line, scroll_height, back_attr):
+        """Scroll the screen down between from_line and scroll_height."""
+        pixels = self.pixels[self.apagenum]
+        old_y0, old_y1 = (from_line-1)*self.font_height, (scroll_height-1)*self.font_height
+        new_y0, new_y1 = from_line*self.font_height, scroll_height*self.font_height
+        pixels[new_y0:new_y1] = pixels[old_y0:old_y1]
+        pixels[old_y0:new_y0] = back_attr
+        self.busy = True
+
+    def put_glyph(self, pagenum, row, col, cp, is_fullwidth, fore, back, blink, underline):
+        """Put a character at a given position."""
+        if not self.text_mode:
+            # in graphics mode, a put_rect call does the actual drawing
+            return
+        attr = fore + self.num_fore_attrs*back + 128*blink
+        x0, y0 = (col-1)*self.font_width, (row-1)*self.font_height
+        try:
+            glyph = self.glyph_dict[cp]
+        except KeyError:
+            logging.warning('No glyph received for code point %s', hex(ord(cp)))
+            glyph = self.glyph_dict[u'\0']
+        glyph_width = glyph.shape[1]
+        area = self.pixels[pagenum][y0:y0+self.font_height, x0:x0+glyph_width]
+        area[:] = numpy.where(glyph, attr, back)
+        if underline:
+            area[-1, :] = attr
+        self.busy = True
+
+    def build_glyphs(self, new_dict):
+        """Build a dict of glyphs for use in text mode."""
+        for char, glyph in iteritems(new_dict):
+            self.glyph_dict[char] = numpy.asarray(glyph, dtype=bool)
+
+    def set_cursor_shape(self, width, height, from_line, to_line):
+        """Build a sprite for the cursor."""
+        self.cursor_width = width
+        self.cursor_from, self.cursor_to = from_line, min(to_line, height-1)
+        self.busy = True
+
+    def put_pixel(self, pagenum, x, y, index):
+        """Put a pixel on the screen; callback to empty character buffer."""
+        self.pixels[pagenum][y, x] = index
+        self.busy = True
+
+    def fill_rect(self, pagenum, x0, y0, x1, y1, index):
+        """Fill a rectangle in a solid attribute."""
+        self.pixels[pagenum][y0:y1+1, x0:x1+1] = index
+        self.busy = True
+
+    def fill_interval(self, pagenum, x0, x1, y, index):
+        """Fill a scanline interval in a solid attribute."""
+        self.pixels[pagenum][y, x0:x1+1] = index
+        self.busy = True
+
+    def put_interval(self, pagenum, x, y, colours):
+        """Write a list of attributes to a scanline interval."""
+        self.pixels[pagenum][y, x:x+len(colours)] = colours
+        self.busy = True
+
+    def put_rect(self, pagenum, x0, y0, x1, y1, array):
+        """Apply numpy array [y][x] of attribytes to an area."""
+        if (x1 < x0) or (y1 < y0):
+            return
+        self.pixels[pagenum][y0:y1+1, x0:x1+1] = array
+        self.busy = True
+
+
+def _png_chunk(chunk_type, data):
+    """Build a PNG chunk with length and checksum."""
+    return b''.join((
+        struct.pack('>L', len(data)), chunk_type, data,
+        struct.pack('>L', zlib.crc32(chunk_type + data) & 0xffffffff)
+    ))
+
+def write_png(png_file, width, height, rgb):
+    """Write 8-bit RGB pixel data to a PNG file."""
+    stride = width * 3
+    # each scanline is preceded by filter type 0 (none)
+    scanlines = b''.join(
+        b'\0' + rgb[offset:offset+stride] for offset in range(0, stride*height, stride)
+    )
+    png_file.write(PNG_SIGNATURE)
+    png_file.write(_png_chunk(b'IHDR', struct.pack('>LLBBBBB', width, height, 8, 2, 0, 0, 0)))
+    png_file.write(_png_chunk(b'IDAT', zlib.compress(scanlines)))
+    png_file.write(_png_chunk(b'IEND', b''))
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+
+""" PC-BASIC benchmark script
+
+Usage: benchmark.py [--save] [--all | NAME ...]
+
+Results are compared against benchmarks/baseline.json, but only if that was recorded
+on the same platform and Python version; otherwise regressions are not reported.
+To regenerate the baseline on a new reference machine, run `benchmark.py --all --save`
+with the Python version that is to be compared against and commit the resulting file.
+
+(c) 2015--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+from __future__ import print_function
+
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+import platform
+import subprocess
+import cProfile
+import pstats
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..'))
+
+BASEDIR = os.path.join(HERE, 'benchmarks')
+BASELINE = os.path.join(BASEDIR, 'baseline.json')
+PACKAGE_DIR = os.path.join(HERE, '..', 'pcbasic')
+
+# relative drop in statements per second that counts as a regression
+TOLERANCE = 0.15
+# number of subsystems to show per benchmark
+NUM_SUBSYSTEMS = 5
+# benchmarks that run with the headless video plugin, so that rendering is measured
+RENDERED = ('GRAPHICS', 'PRINT')
+# built-ins that only wait, e.g. while the interface idles between updates
+IDLE_BUILTINS = ('sleep', 'lock')
+
+try:
+    cpu_clock = time.process_time
+except AttributeError:
+    cpu_clock = time.clock
+
+
+def contained(arglist, elem):
+    try:
+        arglist.remove(elem)
+    except ValueError:
+        return False
+    return True
+
+def get_subsystem(filename):
+    """Group a profiled code location by pcbasic package or module."""
+    path = os.path.abspath(filename)
+    package_dir = os.path.abspath(PACKAGE_DIR)
+    if not path.startswith(package_dir + os.sep):
+        return 'python'
+    parts = os.path.relpath(path, package_dir).split(os.sep)
+    if parts[0] == 'basic' and len(parts) > 1:
+        parts = parts[1:]
+    return os.path.splitext(parts[0])[0]
+
+def is_idle(location):
+    """Profiled code location is a built-in that only waits."""
+    filename, _, funcname = location
+    return filename == '~' and any(word in funcname for word in IDLE_BUILTINS)
+
+def get_peak_memory():
+    """Peak resident memory of this process, in kilobytes; None if not available."""
+    if not resource:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Mac reports bytes, other unixes kilobytes
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+def run_program(name, profiles=None):
+    """Run a benchmark program; return statement count and timings and add to profiles if given."""
+    if name not in RENDERED:
+        return run_session(name, profiles)
+    from pcbasic.interface import Interface
+    interface = Interface(try_interfaces=('headless',), audio_override='none')
+    results = []
+    def target(interface, guard):
+        results.append(run_session(name, profiles, interface))
+    if profiles is None:
+        interface.launch(target)
+    else:
+        # the interface runs in this thread, the session in another
+        profile = cProfile.Profile()
+        profiles.append(profile)
+        profile.runcall(interface.launch, target)
+    if not results:
+        raise RuntimeError('benchmark session did not complete')
+    return results[0]
+
+def run_session(name, profiles=None, interface=None):
+    """Run a benchmark program in a session; return statement count and timings."""
+    import pcbasic
+    if interface:
+        codepage = pcbasic.codepage(u'437')
+        fonts = pcbasic.font(codepage, [u'unifont', u'univga', u'freedos'])
+        kwargs = dict(codepage=codepage, font=fonts)
+    else:
+        kwargs = {}
+    with pcbasic.Session(interface, input_streams=None, output_streams=None, **kwargs) as session:
+        session.execute(b'LOAD "%s.BAS"' % (name.encode('ascii'),))
+        # count executed statements
+        parser = session._impl.interpreter.parser
+        parse_statement = parser.parse_statement
+        counter = [0]
+        def counting_parse_statement(ins, cache=None):
+            counter[0] += 1
+            parse_statement(ins, cache)
+        parser.parse_statement = counting_parse_statement
+        start_time, start_clock = time.time(), cpu_clock()
+        if profiles is None:
+            session.execute(b'RUN')
+        else:
+            profile = cProfile.Profile()
+            profiles.append(profile)
+            profile.runcall(session.execute, b'RUN')
+        # include the time the interface takes to catch up
+        session._impl.queues.video.join()
+        wall, cpu = time.time() - start_time, cpu_clock() - start_clock
+        err = session.evaluate(b'ERR')
+    return counter[0], wall, cpu, err
+
+def run_child(name):
+    """Run one benchmark in this process and write the results as JSON."""
+    workdir = tempfile.mkdtemp(prefix='pcbasic-bench-')
+    try:
+        shutil.copy(os.path.join(BASEDIR, name + '.BAS'), workdir)
+        os.chdir(workdir)
+        # timed run
+        statements, wall, cpu, err = run_program(name)
+        peak = get_peak_memory()
+        # profiled run, for the time per subsystem
+        profiles = []
+        run_program(name, profiles)
+    finally:
+        os.chdir(HERE)
+        shutil.rmtree(workdir)
+    subsystems = defaultdict(float)
+    for location, stat in pstats.Stats(*profiles).stats.items():
+        if is_idle(location):
+            continue
+        # stat is (primitive calls, total calls, own time, cumulative time, callers)
+        subsystems[get_subsystem(location[0])] += stat[2]
+    total = sum(subsystems.values()) or 1.
+    json.dump({
+        'statements': statements,
+        'wall_time': wall,
+        'cpu_time': cpu,
+        'statements_per_second': statements / cpu if cpu else 0.,
+        'peak_memory': peak,
+        'error': err,
+        'subsystems': dict((k, v / total) for k, v in subsystems.items()),
+    }, sys.stdout)
+
+def run_benchmark(name):
+    """Run one benchmark in a fresh interpreter process; return results dict or None."""
+    child = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--child', name],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=HERE
+    )
+    output, errors = child.communicate()
+    if child.returncode:
+        print('\033[01;31mEXCEPTION.\033[00;37m')
+        print('    ' + errors.decode('utf-8', 'replace').strip().splitlines()[-1])
+        return None
+    return json.loads(output.decode('ascii'))
+
+def load_baseline():
+    """Read stored baseline results."""
+    try:
+        with open(BASELINE) as f:
+            return json.load(f)
+    except EnvironmentError:
+        return {}
+
+def save_baseline(results):
+    """Store results as the new baseline."""
+    baseline = load_baseline()
+    baseline.setdefault('benchmarks', {})
+    baseline['python'] = platform.python_version()
+    baseline['platform'] = platform.platform()
+    for name, result in results.items():
+        baseline['benchmarks'][name] = dict(
+            (key, result[key]) for key in ('statements_per_second', 'peak_memory')
+        )
+    with open(BASELINE, 'w') as f:
+        json.dump(baseline, f, indent=4, sort_keys=True)
+        f.write('\n')
+
+def main(args):
+    """Run the benchmarks named in args; return exit status."""
+    save = contained(args, '--save')
+    if not args or '--all' in args:
+        args = sorted(
+            os.path.splitext(f)[0] for f in os.listdir(BASEDIR) if f.upper().endswith('.BAS')
+        )
+    baseline = load_baseline()
+    reference = baseline.get('benchmarks', {})
+    if baseline and (
+            baseline.get('python') != platform.python_version()
+            or baseline.get('platform') != platform.platform()
+        ):
+        print(
+            'Baseline was recorded with Python %s on %s, regressions are not reported.'
+            % (baseline.get('python'), baseline.get('platform'))
+        )
+        comparable = False
+    else:
+        comparable = True
+    results = {}
+    regressed = []
+    start_time = time.time()
+    for name in args:
+        name = os.path.splitext(os.path.basename(name))[0].upper()
+        print('\033[00;37mRunning benchmark \033[01m%-10s\033[00;37m.. ' % name, end='')
+        sys.stdout.flush()
+        if not os.path.isfile(os.path.join(BASEDIR, name + '.BAS')):
+            print('\033[01;31mno such benchmark.\033[00;37m')
+            continue
+        result = run_benchmark(name)
+        if not result:
+            regressed.append(name)
+            continue
+        if result['error']:
+            print('\033[01;31mBASIC error %d.\033[00;37m' % (result['error'],))
+            regressed.append(name)
+            continue
+        results[name] = result
+        print(
+            '%9d stmts  %7.2fs (cpu)  %9.0f stmt/s  %7s kB peak'
+            % (
+                result['statements'], result['cpu_time'], result['statements_per_second'],
+                result['peak_memory'] or '-'
+            ), end=''
+        )
+        if name in reference:
+            ratio = result['statements_per_second'] / reference[name]['statements_per_second']
+            if not comparable:
+                print('  \033[00;36m%+4.0f %%\033[00;37m' % (100.*(ratio-1.),))
+            elif ratio < 1. - TOLERANCE:
+                print('  \033[01;31m%+4.0f %%\033[00;37m' % (100.*(ratio-1.),))
+                regressed.append(name)
+            else:
+                print('  \033[00;32m%+4.0f %%\033[00;37m' % (100.*(ratio-1.),))
+        else:
+            print('  \033[00;36mno baseline\033[00;37m')
+        subsystems = sorted(result['subsystems'].items(), key=lambda item: -item[1])
+        print('    ' + '  '.join(
+            '%s %2.0f%%' % (subsystem, 100.*fraction)
+            for subsystem, fraction in subsystems[:NUM_SUBSYSTEMS]
+        ))
+    print()
+    print('\033[00mRan %d benchmarks in %.2fs (wall)' % (len(results), time.time() - start_time))
+    if regressed:
+        print('    %d regressions: \033[01;31m%s\033[00m' % (len(regressed), ' '.join(regressed)))
+    if save:
+        save_baseline(results)
+        print('    baseline saved to %s' % (os.path.relpath(BASELINE),))
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if contained(args, '--child'):
+        run_child(args[0])
+    else:
+        sys.exit(main(args))
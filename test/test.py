@@ -56,6 +56,10 @@ def contained(arglist, elem):
 args = sys.argv[1:]
 basedir = os.path.join('.', 'correctness')
 
+if contained(args, '--benchmark'):
+    import benchmark
+    sys.exit(benchmark.main(args))
+
 do_suppress = not contained(args, '--loud')
 reraise = contained(args, '--reraise')
 
@@ -0,0 +1,130 @@
+"""
+PC-BASIC tests for array conversion to and from NumPy
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from pcbasic import Session
+from pcbasic.basic import BASICError
+
+
+class SequenceTest(unittest.TestCase):
+    """Tests for Session.set_variable and get_variable with lists and tuples."""
+
+    def setUp(self):
+        """Start a session."""
+        self._session = Session()
+        self._session.start()
+
+    def tearDown(self):
+        """Close the session."""
+        self._session.close()
+
+    def test_list(self):
+        """Nested lists fill an array."""
+        self._session.set_variable(b'A%()', [[1, 2], [3, 4], [5, 6]])
+        self.assertEqual(self._session.evaluate(b'A%(0, 1)'), 2)
+        self.assertEqual(self._session.evaluate(b'A%(2, 1)'), 6)
+
+    def test_tuple(self):
+        """A tuple fills an existing array, also without NumPy."""
+        self._session.execute(b'DIM B%(2)')
+        self._session.set_variable(b'B%()', (1, 2, 3))
+        self.assertEqual(self._session.evaluate(b'B%(0) + B%(1) * 10 + B%(2) * 100'), 321)
+        self._session.set_variable(b'C!()', (1.5, -2.5))
+        self.assertEqual(self._session.evaluate(b'C!(1)'), -2.5)
+
+
+@unittest.skipIf(not numpy, 'Module `numpy` not found')
+class ArrayTest(unittest.TestCase):
+    """Tests for Session.set_variable and get_variable with NumPy arrays."""
+
+    def setUp(self):
+        """Start a session."""
+        self._session = Session()
+        self._session.start()
+
+    def tearDown(self):
+        """Close the session."""
+        self._session.close()
+
+    def _round_trip(self, name, array):
+        """Store an array and read it back."""
+        self._session.set_variable(name, array)
+        return self._session.get_variable(name, numpy.ndarray)
+
+    def test_integer(self):
+        """Integer arrays round-trip and agree with BASIC's view of the elements."""
+        array = numpy.arange(-600, 600, dtype=numpy.int32).reshape((30, 40)) * 50
+        result = self._round_trip(b'A%()', array)
+        self.assertEqual(result.shape, (30, 40))
+        self.assertTrue((result == array).all())
+        self.assertEqual(self._session.evaluate(b'A%(2, 3)'), array[2, 3])
+        self.assertEqual(self._session.evaluate(b'A%(29, 0)'), array[29, 0])
+
+    def test_integer_rounding(self):
+        """Floats are rounded half away from zero when stored in an integer array."""
+        array = numpy.array([0.5, 1.5, -0.5, -1.5, 2.4999, -2.6, 32767.4, -32768.4])
+        result = self._round_trip(b'B%()', array)
+        self.assertEqual(result.tolist(), [1, 2, -1, -2, 2, -3, 32767, -32768])
+
+    def test_integer_overflow(self):
+        """Values that do not fit an integer after rounding raise Overflow."""
+        for value in (32767.5, -32768.5, 40000, float('nan'), float('inf')):
+            with self.assertRaises(BASICError):
+                self._session.set_variable(b'C%()', numpy.array([1., value]))
+
+    def test_single(self):
+        """Single-precision arrays round-trip through MBF."""
+        array = numpy.array([[0., 1., -1.5], [1e-10, 3.25e20, -12345.5]])
+        result = self._round_trip(b'D!()', array)
+        self.assertTrue(numpy.allclose(result, array, rtol=1e-7, atol=0))
+        self.assertEqual(self._session.evaluate(b'D!(1, 2)'), -12345.5)
+
+    def test_double(self):
+        """Double-precision arrays round-trip through MBF."""
+        array = numpy.array([1./3., -2.**-100, 1.5e37, 0.])
+        result = self._round_trip(b'E#()', array)
+        self.assertTrue(numpy.allclose(result, array, rtol=1e-15, atol=0))
+
+    def test_float_overflow(self):
+        """Values out of MBF range raise Overflow."""
+        for name in (b'F!()', b'F#()'):
+            for value in (1e39, -1e39, float('inf'), float('nan')):
+                with self.assertRaises(BASICError):
+                    self._session.set_variable(name, numpy.array([1., value]))
+
+    def test_partial_fill(self):
+        """A smaller array fills the leading part of an existing one."""
+        for name in (b'G%()', b'G!()', b'G#()'):
+            self._session.execute(b'DIM %s(4, 4)' % (name[:-2],))
+            self._session.set_variable(name, numpy.ones((5, 5)) * 7)
+            result = self._round_trip(name, numpy.array([[1.4, 2.], [3., -4.6]]))
+            expected = numpy.ones((5, 5)) * 7
+            if name[-3:-2] == b'%':
+                expected[:2, :2] = [[1, 2], [3, -5]]
+            else:
+                expected[:2, :2] = [[1.4, 2.], [3., -4.6]]
+            self.assertTrue(numpy.allclose(result, expected, rtol=1e-6), name)
+
+    def test_too_large(self):
+        """An array larger than the existing one raises Subscript out of range."""
+        self._session.execute(b'DIM H%(2)')
+        with self.assertRaises(BASICError):
+            self._session.set_variable(b'H%()', numpy.zeros(4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+PC-BASIC tests for the compiled glyph store
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from pcbasic.data import loadhex
+from pcbasic.data.resources import get_data
+
+
+class GlyphStoreTest(unittest.TestCase):
+    """Tests for GlyphStore."""
+
+    def setUp(self):
+        """Create a scratch cache directory."""
+        self._cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the cache directory."""
+        shutil.rmtree(self._cache_dir)
+
+    def _check_store(self, hexres, height):
+        """Open the store from cache and compare with the parsed .hex font."""
+        store = loadhex.GlyphStore.from_cache(hexres, u'test', height, self._cache_dir)
+        try:
+            glyphs = dict(loadhex._parse_hex(hexres, height))
+            self.assertTrue(glyphs)
+            for cluster, glyph in glyphs.items():
+                self.assertEqual(store.get(cluster), glyph)
+            self.assertEqual(store.get(u'\U0010fffd'), None)
+        finally:
+            store.close()
+
+    def test_build_and_reload(self):
+        """Glyphs in a compiled and in a reloaded store match the .hex file."""
+        for height in (8, 16):
+            hexres = get_data(
+                loadhex.FONT_PATTERN, path=loadhex.FONT_DIR, name=u'freedos', height=height
+            )
+            self._check_store(hexres, height)
+            store_names = os.listdir(self._cache_dir)
+            self._check_store(hexres, height)
+            # the second time round, the store is used as is
+            self.assertEqual(os.listdir(self._cache_dir), store_names)
+
+    def test_clusters(self):
+        """Grapheme clusters and double-width glyphs are stored."""
+        hexres = (
+            b'# comment\n'
+            b'0041:0000000018242442427E424242420000\n'
+            b'0041,0301:0000100018242442427E424242420000\n'
+            b'4E00:00000000000000000000000000000000000000007FFE00000000000000000000\n'
+            b'0041:FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF\n'
+        )
+        self._check_store(hexres, 16)
+
+    def test_stale_stores(self):
+        """Older stores of the same font are removed, temporary files are not."""
+        hexres = b'0041:0000000018242442427E424242420000\n'
+        old_store = loadhex.STORE_PATTERN.format(name=u'test', height=16, digest=u'0'*16)
+        other_height = loadhex.STORE_PATTERN.format(name=u'test', height=8, digest=u'0'*16)
+        temp_file = u'%s.12345.tmp' % (old_store,)
+        for name in (old_store, other_height, temp_file):
+            open(os.path.join(self._cache_dir, name), 'wb').close()
+        self._check_store(hexres, 16)
+        names = os.listdir(self._cache_dir)
+        self.assertNotIn(old_store, names)
+        self.assertIn(other_height, names)
+        self.assertIn(temp_file, names)
+        self.assertEqual(len(names), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()